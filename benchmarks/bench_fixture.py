@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"Importing fixture modules holding many data, and tracking inserts"
+
+import types
+
+import sqlalchemy as sa
+import sqlalchemy.interfaces
+
+import wiseguy.fixture
+
+from benchmarks.harness import benchmark
+
+
+def make_module_source(n):
+    lines = [
+        "import itertools",
+        "from wiseguy import fixture",
+        "",
+        "class ArticleData(fixture.Data):",
+        "    _entity = 'Article'",
+        "    class _default:",
+        "        score = itertools.count(1).next",
+        "        body = u'Body'",
+        ]
+    for i in range(n):
+        lines.extend([
+            "    class article_%s:" % i,
+            "        stub = u'article_%s'" % i,
+            "        name = u'Article %s'" % i,
+            ])
+    return compile("\n".join(lines) + "\n", "bench_fixture_data", "exec")
+
+def import_module(code):
+    module = types.ModuleType("bench_fixture_data")
+    exec code in module.__dict__
+    return module
+
+
+@benchmark("fixture.import")
+def fixture_import(size):
+    code = make_module_source(size)
+    return lambda: import_module(code)
+
+@benchmark("fixture.import_and_iterate")
+def fixture_import_and_iterate(size):
+    code = make_module_source(size)
+    return lambda: list(import_module(code).ArticleData)
+
+
+class LegacyInsertProxy(sa.interfaces.ConnectionProxy):
+    "The ConnectionProxy that tracked inserts before InsertTracker"
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    def execute(self, conn, execute, clauseelement, *multiparams, **params):
+        if isinstance(clauseelement, sa.sql.expression.Insert):
+            table = clauseelement.table
+            data = clauseelement.parameters or {}
+            data.update(multiparams[0])
+            primary_keys = wiseguy.fixture.get_primary_keys(table, data)
+            self.tracker.setdefault(table, []).append(primary_keys)
+        return execute(clauseelement, *multiparams, **params)
+
+def make_insert_op(size, tracking, executemany=True):
+    "Insert ``size`` rows, look one up and delete them all"
+    if tracking == "proxy":
+        engine = sa.create_engine("sqlite://", proxy=LegacyInsertProxy(dict()))
+    else:
+        engine = sa.create_engine("sqlite://")
+    if tracking == "events":
+        wiseguy.fixture.InsertTracker().attach(engine)
+    metadata = sa.MetaData()
+    table = sa.Table("Item", metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('name', sa.String(64)))
+    metadata.create_all(engine)
+    rows = [dict(id=i, name=u"Item %s" % i) for i in range(size)]
+    def op():
+        if executemany:
+            engine.execute(table.insert(), rows)
+        else:
+            for row in rows:
+                engine.execute(table.insert(), row)
+        engine.execute(table.select().where(table.c.id == 0)).fetchall()
+        engine.execute(table.delete())
+    return op
+
+@benchmark("fixture.insert_untracked", sizes=(1, 100, 1000))
+def fixture_insert_untracked(size):
+    return make_insert_op(size, None)
+
+# The proxy reads a single parameter set, so it can only track rows
+# inserted one statement at a time.
+@benchmark("fixture.insert_proxy_each", sizes=(1, 100, 1000))
+def fixture_insert_proxy_each(size):
+    return make_insert_op(size, "proxy", executemany=False)
+
+@benchmark("fixture.insert_tracker_each", sizes=(1, 100, 1000))
+def fixture_insert_tracker_each(size):
+    return make_insert_op(size, "events", executemany=False)
+
+@benchmark("fixture.insert_tracker", sizes=(1, 100, 1000))
+def fixture_insert_tracker(size):
+    return make_insert_op(size, "events")
+
+def make_delete_op(size, delete):
+    "Insert ``size`` rows into tables with single and composite keys, then delete them"
+    engine = sa.create_engine("sqlite://")
+    metadata = sa.MetaData()
+    single = sa.Table("Single", metadata,
+        sa.Column('id', sa.Integer, primary_key=True))
+    pair = sa.Table("Pair", metadata,
+        sa.Column('a', sa.Integer, primary_key=True),
+        sa.Column('b', sa.Integer, primary_key=True))
+    metadata.create_all(engine)
+    single_keys = [dict(id=i) for i in range(size)]
+    pair_keys = [dict(a=i, b=i) for i in range(size)]
+    def op():
+        connection = engine.connect()
+        connection.execute(single.insert(), single_keys)
+        connection.execute(pair.insert(), pair_keys)
+        delete(connection, single, single_keys)
+        delete(connection, pair, pair_keys)
+        connection.close()
+    return op
+
+def delete_or_clauses(connection, table, p_key_list):
+    "How delete_data deleted rows before delete_rows"
+    for p_keys in wiseguy.fixture.batch(p_key_list, 100):
+        clauses = [wiseguy.fixture.make_whereclause(table, p_key) for p_key in p_keys]
+        connection.execute(table.delete().where(sa.or_(*clauses)))
+
+@benchmark("fixture.delete_or_clauses", sizes=(1000, 10000))
+def fixture_delete_or_clauses(size):
+    return make_delete_op(size, delete_or_clauses)
+
+@benchmark("fixture.delete_rows", sizes=(1000, 10000))
+def fixture_delete_rows(size):
+    return make_delete_op(size, wiseguy.fixture.delete_rows)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"Parsing, manipulating and serialising ``wiseguy.html`` trees"
+
+import lxml.html
+
+import wiseguy.html
+import wiseguy.html_tidy
+
+from benchmarks.harness import benchmark
+
+
+def make_document(n):
+    "An HTML document with ``n`` ``div.item`` elements, each holding a paragraph"
+    items = "".join(
+        ['<div class="item" id="item-%s"><p>Item <em>%s</em> &#163;</p></div>' % (i, i)
+         for i in range(n)])
+    return "<html><head><title>Items</title></head><body>%s</body></html>" % items
+
+
+@benchmark("html.parse")
+def html_parse(size):
+    src = make_document(size)
+    return lambda: wiseguy.html.Html(src)
+
+@benchmark("html.parse_cached")
+def html_parse_cached(size):
+    src = make_document(size)
+    wiseguy.html.enable_parse_cache()
+    wiseguy.html.Html(src)
+    return lambda: wiseguy.html.Html(src)
+
+@benchmark("html.add")
+def html_add(size):
+    tree = wiseguy.html.Html(make_document(size))
+    items = tree.cssselect(".item")
+    new = wiseguy.html.Html('<span class="new">New</span>')
+    def op():
+        tree.add(".item", new)
+        for item in items:
+            del item[1:]
+    return op
+
+def _add_fragment(size, move):
+    tree = wiseguy.html.Html(make_document(1))
+    target = tree.cssselect("body")[0]
+    src = make_document(size)
+    def op():
+        fragment = wiseguy.html.Html(src)
+        tree.add("body", fragment, move=move)
+        del target[1:]
+    return op
+
+@benchmark("html.add_fragment")
+def html_add_fragment(size):
+    return _add_fragment(size, move=False)
+
+@benchmark("html.add_fragment_move")
+def html_add_fragment_move(size):
+    return _add_fragment(size, move=True)
+
+@benchmark("html.replace")
+def html_replace(size):
+    tree = wiseguy.html.Html(make_document(size))
+    new = wiseguy.html.Html('<div class="item"><p>Replaced</p></div>')
+    return lambda: tree.replace(".item", new)
+
+@benchmark("html.set_attr")
+def html_set_attr(size):
+    tree = wiseguy.html.Html(make_document(size))
+    return lambda: tree.set_attr(".item", "data-state", "seen")
+
+@benchmark("html.tostring")
+def html_tostring(size):
+    tree = wiseguy.html.Html(make_document(size))
+    return lambda: lxml.html.tostring(tree, pretty_print=True)
+
+@benchmark("html.tidy_html")
+def html_tidy_html(size):
+    tree = wiseguy.html.Html(make_document(size))
+    return lambda: wiseguy.html_tidy.tidy_html(tree)
+
+_tidy_form = (
+    '<form><fieldset><legend><!-- Not the legend of King Arthur! -->Your Information</legend>'
+    '<div class="control-group"><label class="control-label" for="name">Name:</label>'
+    '<input id="name"></div><p>&nbsp;<span>&nbsp;&nbsp;</span>&nbsp;</p>'
+    '<div>Hello<div>Mr</div>Flibble</div></fieldset></form>')
+
+@benchmark("html.tidy_html_forms")
+def html_tidy_html_forms(size):
+    tree = wiseguy.html.Html(
+        "<html><head><title>A Form</title></head><body>%s</body></html>" % (
+            _tidy_form * size))
+    return lambda: wiseguy.html_tidy.tidy_html(tree)
+
+@benchmark("html.tidy_html_deep", sizes=(10, 100))
+def html_tidy_html_deep(size):
+    tree = wiseguy.html.Html(
+        "<html><body>%s%s</body></html>" % (
+            "<div><p>Level</p>" * size, "</div>" * size))
+    return lambda: wiseguy.html_tidy.tidy_html(tree)
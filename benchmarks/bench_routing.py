@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"Binding a ``UrlMap`` to an environ and matching the URL"
+
+import werkzeug as wz
+import werkzeug.routing
+import werkzeug.test
+
+from wiseguy import web_utils
+
+from benchmarks.harness import benchmark
+
+
+def _rules(size):
+    rules = []
+    for i in range(size):
+        rules.append(wz.routing.Rule("/page/%s" % i, endpoint="page_%s" % i))
+        rules.append(wz.routing.Rule("/item/%s/<int:id>" % i, endpoint="item_%s" % i))
+    return rules
+
+def _match(url_map, path):
+    environ = wz.test.EnvironBuilder(path=path).get_environ()
+    return lambda: url_map.bind_to_environ(environ).match()
+
+
+@benchmark("routing.match_static")
+def routing_match_static(size):
+    return _match(web_utils.UrlMap(_rules(size)), "/page/%s" % (size // 2))
+
+@benchmark("routing.match_fallback")
+def routing_match_fallback(size):
+    return _match(web_utils.UrlMap(_rules(size)), "/item/%s/7" % (size // 2))
+
+@benchmark("routing.werkzeug_match_static")
+def routing_werkzeug_match_static(size):
+    return _match(wz.routing.Map(_rules(size)), "/page/%s" % (size // 2))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"Rendering ``wiseguy.template`` templates"
+
+import wiseguy.html
+import wiseguy.template as wt
+
+from benchmarks.harness import benchmark
+
+
+def _items_list(items):
+    ul = wiseguy.html.Html("<ul></ul>")
+    for item in items:
+        li = wiseguy.html.Html("<li></li>")
+        li.text = item
+        ul.append(li)
+    return ul
+
+def make_template():
+    class template(wt.Template):
+        element = wiseguy.html.Html(
+            "<html><head><title></title></head>"
+            "<body><h1></h1><div class=\"items\"></div></body></html>")
+        transforms = [
+            wt.Transform("title", wt.set_text("title", lambda title: title)),
+            wt.Transform("title", wt.set_text("h1", lambda title: title)),
+            wt.Transform("items", wt.add(".items", _items_list))]
+    return template
+
+
+@benchmark("template.render")
+def template_render(size):
+    template = make_template()
+    items = [u"Item %s" % i for i in range(size)]
+    return lambda: template.render(title=u"Items", items=items)
+
+@benchmark("template.render_layout", sizes=(10, 100, 1000))
+def template_render_layout(size):
+    class template(wt.Template):
+        element = wiseguy.html.Html(
+            "<html><head><title></title></head><body><div id=\"nav\">%s</div>"
+            "<h1></h1><div class=\"footer\">%s</div></body></html>" % (
+                "".join('<p><a href="/%s">Link %s</a></p>' % (i, i) for i in range(size)),
+                "".join('<p>Footer %s</p>' % i for i in range(size))))
+        transforms = [
+            wt.Transform("title", wt.set_text("title", lambda title: title)),
+            wt.Transform("title", wt.set_text("h1", lambda title: title))]
+    return lambda: template.render(title=u"Layout")
+
+@benchmark("template.render_static", sizes=(1,))
+def template_render_static(size):
+    template = make_template()
+    return lambda: template.render()
+
+@benchmark("template.render_assets", sizes=(10,))
+def template_render_assets(size):
+    import wiseguy.transforms
+    template = make_template()
+    for i in range(size):
+        template.transforms.append(
+            wiseguy.transforms.add_stylesheet("/static/style%s.css" % i))
+        template.transforms.append(
+            wiseguy.transforms.add_script("/static/script%s.js" % i))
+    return lambda: template.render(title=u"Assets")
+
+@benchmark("transforms.fix_urls", sizes=(100, 1000))
+def transforms_fix_urls(size):
+    import werkzeug
+    import wiseguy.transforms
+    body = "".join(
+        '<p><a href="/page/%s">Page</a><img src="/img/%s.png"></p>' % (i % 50, i % 50)
+        for i in range(size))
+    element = wiseguy.html.Html("<html><body>%s</body></html>" % body)
+    url = werkzeug.Href("/mountpoint")
+    return lambda: wiseguy.transforms._fix_urls(
+        element.__deepcopy__(None), url)
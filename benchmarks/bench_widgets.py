@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"The form_fields and widgets helpers"
+
+import lxml.html
+
+import wiseguy.html
+from wiseguy import form_fields, jade_mixins, widgets
+
+from benchmarks.harness import benchmark
+
+
+def _item_url(**kwargs):
+    return "/items?" + "&".join(["%s=%s" % item for item in sorted(kwargs.items())])
+
+
+@benchmark("form_fields.select")
+def form_fields_select(size):
+    options = [(i, u"Option %s" % i) for i in range(size)]
+    context = dict(data=dict(choice=unicode(size // 2)))
+    return lambda: lxml.html.tostring(
+        form_fields.select(context, "choice", "Choice", options))
+
+@benchmark("form_fields.bootstrap_form")
+def form_fields_bootstrap_form(size):
+    fields = form_fields.BootstrapFormFields()
+    ids = ["field_%s" % i for i in range(size)]
+    context = dict(
+        data=dict((id, u"Value") for id in ids),
+        errors=dict((id, u"Required") for id in ids[::10]))
+    def op():
+        for id in ids:
+            lxml.html.tostring(fields.input(context, id, u"Label"))
+    return op
+
+@benchmark("widgets.pagination")
+def widgets_pagination(size):
+    limit = 20
+    context = dict(total=size * limit, offset=(size // 2) * limit, limit=limit)
+    return lambda: widgets.pagination(context, _item_url)
+
+@benchmark("widgets.pagination_window")
+def widgets_pagination_window(size):
+    limit = 20
+    context = dict(total=size * limit, offset=(size // 2) * limit, limit=limit)
+    return lambda: widgets.pagination(context, _item_url, window=5)
+
+@benchmark("form_fields.select_option_set")
+def form_fields_select_option_set(size):
+    options = wiseguy.html.OptionSet([(i, u"Option %s" % i) for i in range(size)])
+    context = dict(data=dict(choice=unicode(size // 2)))
+    return lambda: lxml.html.tostring(
+        form_fields.select(context, "choice", "Choice", options))
+
+@benchmark("jade_mixins.select")
+def jade_mixins_select(size):
+    options = [(i, u"Option %s" % i) for i in range(size)]
+    return lambda: jade_mixins.select("choice", options, selected=unicode(size // 2))
+
+@benchmark("jade_mixins.select_option_set")
+def jade_mixins_select_option_set(size):
+    options = wiseguy.html.OptionSet([(i, u"Option %s" % i) for i in range(size)])
+    return lambda: jade_mixins.select("choice", options, selected=unicode(size // 2))
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""A small harness for timing wiseguy.
+
+Benchmarks are registered with ``benchmark``, which takes a setup
+function.  The setup function is called with a size and returns the
+operation to time.  Each (benchmark, size) pair is run in a forked
+child process, so the peak memory it reports is its own.
+
+For every run the results record:
+
+ops_per_sec
+    calls of the operation per second, from the best of ``repeat``
+    rounds of at least ``min_time`` seconds each
+peak_memory_kb
+    growth of the child's peak resident set size over the whole run,
+    including setup
+net_live_objects
+    objects tracked by the garbage collector that one call creates,
+    less those it frees; this is not an allocation count, a call that
+    allocates and frees a lot scores 0, but it shows up leaks and
+    growing structures
+allocated_kb
+    peak memory allocated by one call, when ``tracemalloc`` is
+    available (it isn't in stock Python 2)
+"""
+
+import gc, json, os, platform, subprocess, sys, time, timeit, traceback
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+SIZES = (10, 100, 1000, 10000)
+
+registry = []
+
+
+class Benchmark(object):
+    def __init__(self, name, setup, sizes):
+        self.name = name
+        self.setup = setup
+        self.sizes = tuple(sizes)
+
+    def __repr__(self):
+        return "<Benchmark %s>" % self.name
+
+
+def benchmark(name, sizes=SIZES):
+    "Register ``setup(size)``, which returns the operation to time"
+    def _register(setup):
+        registry.append(Benchmark(name, setup, sizes))
+        return setup
+    return _register
+
+
+def _max_rss_kb():
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        max_rss = max_rss // 1024
+    return max_rss
+
+def _time_op(op, min_time, repeat):
+    timer = timeit.default_timer
+    best = None
+    for i in range(repeat):
+        number = 1
+        while True:
+            start = timer()
+            for j in xrange(number):
+                op()
+            elapsed = timer() - start
+            if elapsed >= min_time:
+                break
+            number = number * 2
+        rate = number / elapsed
+        if (best is None) or (rate > best[0]):
+            best = (rate, number)
+    return best
+
+def _net_live_objects(op):
+    gc.collect()
+    gc.disable()
+    try:
+        before = gc.get_count()[0]
+        op()
+        return gc.get_count()[0] - before
+    finally:
+        gc.enable()
+
+def _allocated_kb(op):
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        op()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return (peak - start) // 1024
+
+def measure(bench, size, min_time=0.2, repeat=3):
+    "Run ``bench`` at ``size`` in this process and return its result"
+    start_rss = _max_rss_kb()
+    op = bench.setup(size)
+    op()
+    net_live_objects = _net_live_objects(op)
+    allocated_kb = _allocated_kb(op)
+    ops_per_sec, number = _time_op(op, min_time, repeat)
+    end_rss = _max_rss_kb()
+    if start_rss is None:
+        peak_memory_kb = None
+    else:
+        peak_memory_kb = end_rss - start_rss
+    return dict(
+        name=bench.name,
+        size=size,
+        ops_per_sec=ops_per_sec,
+        mean_us=1e6 / ops_per_sec,
+        iterations=number,
+        peak_memory_kb=peak_memory_kb,
+        net_live_objects=net_live_objects,
+        allocated_kb=allocated_kb)
+
+def _error(bench, size):
+    return dict(name=bench.name, size=size, error=traceback.format_exc())
+
+def measure_isolated(bench, size, **kwargs):
+    "Run ``measure`` in a forked child, where fork is available"
+    if not hasattr(os, 'fork'):
+        try:
+            return measure(bench, size, **kwargs)
+        except Exception:
+            return _error(bench, size)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            result = measure(bench, size, **kwargs)
+        except Exception:
+            result = _error(bench, size)
+        with os.fdopen(write_fd, 'w') as f:
+            f.write(json.dumps(result))
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        data = f.read()
+    os.waitpid(pid, 0)
+    if not data:
+        return dict(name=bench.name, size=size, error="child exited without a result")
+    return json.loads(data)
+
+
+def environment():
+    "Describe where the benchmarks ran, to go alongside the results"
+    import lxml.etree
+    try:
+        commit = subprocess.Popen(
+            ["git", "rev-parse", "HEAD"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=os.path.dirname(os.path.abspath(__file__))).communicate()[0].strip()
+    except OSError:
+        commit = None
+    return dict(
+        commit=commit or None,
+        python=platform.python_version(),
+        implementation=platform.python_implementation(),
+        platform=platform.platform(),
+        lxml=lxml.etree.__version__,
+        time=time.strftime("%Y-%m-%dT%H:%M:%S"))
+
+def run(names=None, sizes=None, min_time=0.2, repeat=3, report=None):
+    "Run the registered benchmarks, optionally only those matching ``names``"
+    results = []
+    for bench in registry:
+        if names and not any(n in bench.name for n in names):
+            continue
+        for size in bench.sizes:
+            if sizes and not size in sizes:
+                continue
+            result = measure_isolated(bench, size, min_time=min_time, repeat=repeat)
+            if report:
+                report(result)
+            results.append(result)
+    return dict(environment=environment(), results=results)
+
+
+def compare(old, new, threshold=0.1):
+    """Yield (name, size, old ops/sec, new ops/sec, ratio, flag) for the
+    results in both runs.  ``flag`` marks changes beyond ``threshold``."""
+    old_results = dict(
+        ((r['name'], r['size']), r) for r in old['results'] if 'ops_per_sec' in r)
+    for result in new['results']:
+        key = (result['name'], result['size'])
+        if not (key in old_results and 'ops_per_sec' in result):
+            continue
+        before = old_results[key]['ops_per_sec']
+        after = result['ops_per_sec']
+        ratio = after / before
+        if ratio < 1 - threshold:
+            flag = "slower"
+        elif ratio > 1 + threshold:
+            flag = "faster"
+        else:
+            flag = ""
+        yield key[0], key[1], before, after, ratio, flag
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Run the wiseguy benchmarks.
+
+    python -m benchmarks.run [-o results.json] [-k NAME] [-s 10,100]
+    python -m benchmarks.run --compare old.json new.json
+"""
+
+import json, optparse, sys
+
+from benchmarks import harness
+from benchmarks import bench_html, bench_template, bench_widgets, bench_fixture, bench_routing
+
+
+def _report(result):
+    if 'error' in result:
+        line = "%-32s %6s  ERROR" % (result['name'], result['size'])
+    else:
+        line = "%-32s %6s  %12.1f ops/s  %10.1f us  %8s kB" % (
+            result['name'],
+            result['size'],
+            result['ops_per_sec'],
+            result['mean_us'],
+            result['peak_memory_kb'])
+    print >> sys.stderr, line
+
+def _compare(old_path, new_path, threshold):
+    old = json.load(open(old_path))
+    new = json.load(open(new_path))
+    for name, size, before, after, ratio, flag in harness.compare(old, new, threshold):
+        print "%-32s %6s  %12.1f -> %12.1f ops/s  %5.2fx  %s" % (
+            name, size, before, after, ratio, flag)
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage=__doc__.strip())
+    parser.add_option("-o", "--output", help="write the JSON results to this file")
+    parser.add_option("-k", "--name", action="append", dest="names",
+                      help="only run benchmarks whose name contains NAME")
+    parser.add_option("-s", "--sizes", help="comma separated sizes to run")
+    parser.add_option("--min-time", type="float", default=0.2,
+                      help="minimum seconds per timing round")
+    parser.add_option("--repeat", type="int", default=3,
+                      help="timing rounds, of which the best is kept")
+    parser.add_option("--compare", action="store_true",
+                      help="compare two JSON result files")
+    parser.add_option("--threshold", type="float", default=0.1,
+                      help="relative change --compare flags")
+    options, args = parser.parse_args(argv)
+    if options.compare:
+        if not len(args) == 2:
+            parser.error("--compare needs two result files")
+        _compare(args[0], args[1], options.threshold)
+        return
+    sizes = None
+    if options.sizes:
+        sizes = [int(s) for s in options.sizes.split(",")]
+    results = harness.run(
+        names=options.names,
+        sizes=sizes,
+        min_time=options.min_time,
+        repeat=options.repeat,
+        report=_report)
+    data = json.dumps(results, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(data)
+    else:
+        print data
+
+
+if __name__ == "__main__":
+    main()
@@ -23,7 +23,7 @@ setup(
     url='http://singletoned.net',
     license='',
     scripts=["wiseguy/scripts/parse_jade.py", "wiseguy/scripts/html2jade.py"],
-    packages=find_packages(exclude=['ez_setup', 'examples', 'tests']),
+    packages=find_packages(exclude=['ez_setup', 'examples', 'tests', 'benchmarks']),
     include_package_data=True,
     zip_safe=False,
     install_requires=[
@@ -228,6 +228,26 @@ def test_to_dict():
     assert d2['foo'] == u'bar'
 
 
+def test_lazy_datum():
+    counter = itertools.count(1).next
+    class LazyData(fixture.Data):
+        _entity = schema.Article
+        class _default:
+            score = counter
+        class first:
+            stub = u"first"
+        class second:
+            stub = u"second"
+
+    assert isinstance(LazyData.__dict__['second'], fixture.PendingDatum)
+    assert LazyData.second.score == 1
+    assert LazyData.first.score == 2
+    assert LazyData.second.score == 1
+    assert isinstance(LazyData.__dict__['second'], fixture.DatumMeta)
+    assert len(LazyData) == 2
+    assert set(d.stub for d in LazyData) == set([u"first", u"second"])
+
+
 def test_data_inheritance():
     schema.with_empty_db()
 
@@ -525,7 +545,7 @@ def test_to_dict():
             stub=u"article1",
             name=u"The First Article",
             body=u"An article which is first\nblah, blah",
-            score=2)
+            score=ArticleData.article1.score)
         result = fixture._item_to_dict(article)
         assert result == expected
 
@@ -534,7 +554,7 @@ def test_to_dict():
             stub=u"article1",
             name=u"The First Article",
             body=u"An article which is first\nblah, blah",
-            score=2)
+            score=ArticleData.article1.score)
         result = fixture._item_to_dict(article, foo=u"bar")
         assert result == expected
 
@@ -557,3 +577,169 @@ def test_SQLAlchemyTester():
 
     with EmptyFixture(sa_loader) as tester:
         assert tester.Article.count() == 0
+
+def test_bulk_loader():
+    schema.with_empty_db()
+    bulk_loader = fixture.SQLAlchemyLoader(schema, schema.Session, bulk=True)
+
+    class BulkFixture(fixture.Fixture):
+        class ArticleData(fixture.Data):
+            def make_data():
+                for i in range(1, 1201):
+                    yield "article_%s" % i, dict(
+                        stub="article_%s" % i,
+                        name="Article %s" % i,
+                        body="blah, blah",
+                        score=i)
+        class CommentData:
+            comment1 = CommentData.comment1
+
+    with FirstFixture(sa_loader) as T1:
+        with BulkFixture(bulk_loader) as T2:
+            assert T2.Article.count() == 1201
+            assert T2.Comment.count() == 1
+            assert len(T2._data_added[schema.Article]) == 1200
+            assert len(T2._data_updated[schema.Comment]) == 1
+            assert T2.Article.get("article_7").score == 7
+            expected = BulkFixture.ArticleData.article_7.to_dict()
+            assert expected in T2._data_added[schema.Article]
+
+        assert T1.Article.count() == 1
+        assert T1.Comment.count() == 1
+        T1.session.expire_all()
+        assert T1.Comment.one().body == CommentData.comment1.body
+
+def test_TransactionalLoader():
+    schema.with_empty_db()
+    transactional_loader = fixture.TransactionalLoader(schema, schema.Session)
+
+    with FirstFixture(transactional_loader) as T1:
+        assert T1.Article.count() == 1
+        assert T1.Comment.count() == 1
+        assert T1._data_added[schema.Article]
+
+        session = schema.Session()
+        assert session.query(schema.Article).count() == 0
+        session.close()
+
+    assert transactional_loader._connection is None
+    session = schema.Session()
+    assert session.query(schema.Article).count() == 0
+    assert session.query(schema.Comment).count() == 0
+    session.close()
+
+    with FirstFixture(transactional_loader) as T1:
+        assert T1.Article.count() == 1
+
+def test_InsertTracker():
+    engine = sa.create_engine("sqlite://")
+    schema.metadata.create_all(engine)
+    tracker = fixture.InsertTracker().attach(engine)
+    engine.execute(schema.article_table.insert(), stub="a1", name="A1")
+    engine.execute(schema.article_table.insert(), [
+        dict(stub="a%s" % i, name="A%s" % i) for i in range(2, 5)])
+    engine.execute(schema.comment_table.insert(), article_stub="a1")
+    engine.execute(schema.article_table.select()).fetchall()
+
+    assert tracker.count(schema.article_table) == 4
+    assert tracker.primary_keys(schema.article_table) == [
+        dict(stub="a%s" % i) for i in range(1, 5)]
+    assert tracker.primary_keys(schema.comment_table) == [dict(id=1)]
+
+    tracker.detach(engine)
+    engine.execute(schema.comment_table.insert(), article_stub="a2")
+    assert tracker.count(schema.comment_table) == 1
+    tracker.clear()
+    assert tracker.primary_keys(schema.article_table) == []
+
+def test_delete_rows():
+    engine = sa.create_engine("sqlite://")
+    metadata = sa.MetaData()
+    single = sa.Table("Single", metadata,
+        sa.Column('id', sa.Integer, primary_key=True))
+    pair = sa.Table("Pair", metadata,
+        sa.Column('a', sa.Integer, primary_key=True),
+        sa.Column('b', sa.String(8), primary_key=True))
+    metadata.create_all(engine)
+    assert fixture.bind_param_limit(engine.dialect) == 999
+    assert fixture.has_row_values(engine.dialect) == (
+        engine.dialect.dbapi.sqlite_version_info >= (3, 15))
+
+    engine.execute(single.insert(), [dict(id=i) for i in range(2500)])
+    engine.execute(pair.insert(), [
+        dict(a=i, b=b) for i in range(1500) for b in ("x", "y")])
+    connection = engine.connect()
+    transaction = connection.begin()
+    fixture.delete_rows(connection, single, [dict(id=i) for i in range(2500)])
+    fixture.delete_rows(connection, pair, [dict(a=i, b="y") for i in range(1500)])
+    transaction.rollback()
+    assert connection.execute(single.count()).scalar() == 2500
+    assert connection.execute(pair.count()).scalar() == 3000
+
+    fixture.delete_rows(connection, single, [dict(id=i) for i in range(1, 2500)])
+    fixture.delete_rows(connection, pair, [dict(a=i, b="x") for i in range(1500)])
+    assert [tuple(row) for row in connection.execute(single.select())] == [(0,)]
+    rows = connection.execute(pair.select()).fetchall()
+    assert len(rows) == 1500
+    assert set(row.b for row in rows) == set(["y"])
+    connection.close()
+
+def test_entity_info():
+    info = fixture.entity_info(schema.Article)
+    assert fixture.entity_info(schema.Article) is info
+    assert info.table is schema.article_table
+    assert info.tables == [schema.article_table]
+    assert info.p_key_names == ["stub"]
+    assert sorted(info.column_names) == ["body", "name", "score", "stub"]
+    assert info.property_keys == frozenset(["body", "name", "score", "stub"])
+    assert info.column_keys["score"] == "score"
+
+def test_load_stages():
+    entities = [
+        (schema.Comment, CommentData),
+        (schema.Article, ArticleData),
+        (schema.Article, SecondFixture.ArticleData)]
+    stages = fixture._load_stages(entities, keep_constraints=True)
+    assert stages == [
+        [[(schema.Article, ArticleData), (schema.Article, SecondFixture.ArticleData)]],
+        [[(schema.Comment, CommentData)]]]
+    stages = fixture._load_stages(entities, keep_constraints=False)
+    assert len(stages) == 1
+    assert sorted(len(task) for task in stages[0]) == [1, 2]
+
+def test_parallel_loader():
+    schema.with_empty_db()
+    parallel_loader = fixture.SQLAlchemyLoader(schema, schema.Session, workers=2)
+    entity_classes, data_added, data_updated = parallel_loader.add_data(
+        FirstFixture._data, keep_constraints=True)
+    assert entity_classes == set([schema.Article, schema.Comment])
+    assert len(data_added[schema.Article]) == 1
+    assert len(data_added[schema.Comment]) == 1
+    session = schema.Session()
+    assert session.query(schema.Comment).one().article_stub == "article1"
+    session.close()
+    parallel_loader.delete_data(data_added)
+    session = schema.Session()
+    assert session.query(schema.Article).count() == 0
+    session.close()
+
+def test_parallel_loader_failure():
+    class FailingLoader(fixture.SQLAlchemyLoader):
+        def _load_task(self, entities, overwrite_data, bulk):
+            if [entity_class for (entity_class, items_data) in entities
+                if entity_class is schema.Comment]:
+                raise ValueError("Comment failed")
+            return super(FailingLoader, self)._load_task(entities, overwrite_data, bulk)
+
+    schema.with_empty_db()
+    loader = FailingLoader(schema, schema.Session, workers=2)
+    try:
+        loader.add_data(FirstFixture._data, keep_constraints=True)
+    except ValueError, e:
+        assert str(e) == "Comment failed"
+    else:
+        assert False, "The failed task should raise"
+    session = schema.Session()
+    assert session.query(schema.Article).count() == 0
+    assert session.query(schema.Comment).count() == 0
+    session.close()
@@ -4,6 +4,7 @@ import unittest
 
 import lxml.html
 
+import wiseguy.html
 from wiseguy import form_fields, wrappers, utils
 
 class TestInput(unittest.TestCase):
@@ -117,6 +118,19 @@ class TestInput(unittest.TestCase):
         result = lxml.html.tostring(result, pretty_print=True).strip()
         self.assertEqual(expected, result)
 
+    def test_repeated(self):
+        first = wrappers.compulsory(
+            form_fields.input(dict(data=dict(foo='blah')), 'foo', "Foo:"))
+        second = form_fields.input(dict(), 'foo', "Foo:")
+        assert not first is second
+        expected = '''
+<div>
+<label for="foo">Foo:</label><input type="text" id="foo" value="" name="foo">
+</div>
+        '''.strip()
+        result = lxml.html.tostring(second, pretty_print=True).strip()
+        self.assertEqual(expected, result)
+
 
 class TestSearch(unittest.TestCase):
     def test_plain(self):
@@ -592,6 +606,22 @@ class TestSelect(unittest.TestCase):
         result = lxml.html.tostring(result, pretty_print=True).strip()
         self.assertEqual(expected, result)
 
+    def test_option_set_multiple(self):
+        options = wiseguy.html.OptionSet([('bar1', "Bar 1"), ('bar2', "Bar 2"), ('bar3', "Bar 3")])
+        context = dict(data=dict(foo=['bar1', 'bar3']))
+        expected = '''
+<div>
+<label for="foo">Foo:</label><select multiple id="foo" name="foo">
+<option value=""></option>
+<option selected value="bar1">Bar 1</option>
+<option value="bar2">Bar 2</option>
+<option selected value="bar3">Bar 3</option></select>
+</div>
+'''.strip()
+        result = form_fields.select(context, 'foo', "Foo:", options, multiple=True)
+        result = lxml.html.tostring(result, pretty_print=True).strip()
+        self.assertEqual(expected, result)
+
 
 class TestDatePicker(unittest.TestCase):
     def test_simple(self):
@@ -235,3 +235,79 @@ def test_HtmlElement():
     result = h.DIV(
         wg.html.Html("<br>").join(data)).to_string().strip()
     assert expected == result
+
+def test_selector_cache():
+    wg.html.selector_cache.clear()
+    t = wg.html.Html("<div><p class='foo'></p><p></p></div>")
+    t.set_attr("p.foo", "title", "flibble")
+    t.add_class("p.foo", "bar")
+    t.add("p.foo", "wibble")
+    stats = wg.html.selector_cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 2
+    assert wg.html.compile_selector("p.foo") is wg.html.compile_selector("p.foo")
+
+    result = t.to_string(pretty=False)
+    expected = '''<div><p class="foo bar" title="flibble">wibble</p><p></p></div>'''
+    assert result == expected
+
+def test_parse_cache():
+    cache = wg.html.enable_parse_cache(maxsize=2)
+    try:
+        src = "<div><p class='foo'></p></div>"
+        first = wg.html.Html(src)
+        first.add_class("p", "bar")
+        second = wg.html.Html(src)
+        assert not second is first
+        assert second.to_string(pretty=False) == '<div><p class="foo"></p></div>'
+        assert isinstance(second, wg.html.HtmlElement)
+
+        wg.html.Html("<p>Other</p>")
+        wg.html.Html("<p>Another</p>")
+        stats = wg.html.parse_cache_stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 3
+        assert stats['evictions'] == 1
+        assert stats['size'] == 2
+
+        wg.html.jade("div= x", dict(x=1))
+        assert wg.html.jade("div= x", dict(x=2)).to_string(pretty=False) == "<div>2</div>"
+        assert wg.html.jade("div= x", dict(x=[3])).to_string(pretty=False) == "<div>[3]</div>"
+    finally:
+        wg.html.disable_parse_cache()
+    assert wg.html.parse_cache_stats() is None
+    assert not wg.html.Html(src) is wg.html.Html(src)
+
+def test_OptionSet():
+    options = wg.html.OptionSet([("a", "A"), "b", (3, u"C£"), ("a", "Another A")])
+    assert len(options) == 4
+    assert options.options[2] == (u"3", u"C£")
+    assert options.selected_indexes("a") == [0, 3]
+    assert options.selected_indexes(["b", 3, "z"]) == [1, 2]
+    assert options == wg.html.OptionSet(options.options)
+    assert hash(options) == hash(wg.html.OptionSet(options.options))
+    assert wg.html.OptionSet.from_options(options) is options
+
+    plain = options.markup()
+    assert plain[1] == '<option value="b">b</option>'
+    assert plain[2] == '<option value="3">C&#163;</option>'
+    selected = options.markup(["b"])
+    assert selected[1] == '<option selected value="b">b</option>'
+    assert selected[0] == plain[0]
+    assert options.markup()[1] == '<option value="b">b</option>'
+
+def test_add_move():
+    t = wg.html.Html("<div><p class='a'></p><p class='a'></p></div>")
+    new = wg.html.Html("<span>new</span>")
+    t.add(".a", new, move=True)
+    targets = t.cssselect(".a")
+    assert not targets[0][0] is new
+    assert targets[1][0] is new
+    assert t.to_string(pretty=False) == (
+        '<div><p class="a"><span>new</span></p><p class="a"><span>new</span></p></div>')
+
+    new = wg.html.Html("<em>new</em>")
+    t.replace("span", new, move=True)
+    assert new.getparent() is targets[1]
+    assert t.to_string(pretty=False) == (
+        '<div><p class="a"><em>new</em></p><p class="a"><em>new</em></p></div>')
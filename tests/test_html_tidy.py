@@ -2,6 +2,8 @@
 
 import unittest
 
+import lxml.etree
+
 import wiseguy as wg
 import wiseguy.html_tidy
 import wiseguy.html
@@ -279,3 +281,39 @@ Name:
 </p>'''.strip()
         result = wg.html_tidy.tidy_html(t).strip()
         self.assertEqual(result, expected)
+
+    def test_deep(self):
+        depth = 2000
+        t = wg.html.Html("<html><body></body></html>")
+        el = t.find("body")
+        for i in range(depth):
+            el = lxml.etree.SubElement(el, "div")
+            lxml.etree.SubElement(el, "p").text = "x"
+        lines = wg.html_tidy.tidy_html(t, with_doctype=False).splitlines()
+        self.assertEqual(len(lines), 4 + 5 * depth)
+        self.assertEqual(lines[4 * depth], "  " * (depth + 3) + "x")
+        self.assertEqual(lines[-1], "</html>")
+
+
+class Test_iter_tidy_html(unittest.TestCase):
+    def setUp(self):
+        self.t = wg.html.Html(
+            "<html><body>%s</body></html>" % "".join(
+                ['<div class="item"><p>Item %s &#163;</p></div>' % i for i in range(50)]))
+
+    def test_iter_tidy_html(self):
+        chunks = list(wg.html_tidy.iter_tidy_html(self.t, chunk_size=256))
+        assert len(chunks) > 1
+        for chunk in chunks:
+            assert isinstance(chunk, str)
+        for chunk in chunks[:-1]:
+            assert len(chunk) >= 256
+        expected = wg.html_tidy.tidy_html(self.t).encode('utf-8')
+        self.assertEqual("".join(chunks), expected)
+
+    def test_iter_normalised_html(self):
+        chunks = list(wg.html_tidy.iter_normalised_html(self.t, chunk_size=256))
+        assert len(chunks) > 1
+        expected = wg.html_tidy.normalise_html(self.t).encode('utf-8')
+        self.assertEqual("".join(chunks), expected)
+
@@ -2,6 +2,7 @@
 
 import unittest
 
+import wiseguy.html
 import wiseguy.jade_mixins
 
 
@@ -38,3 +39,33 @@ class TestSelect(unittest.TestCase):
 '''.strip()
         result = wiseguy.jade_mixins.select('foo', options, blank_option=True).strip()
         self.assertEqual(expected, result)
+
+    def test_option_set_multiple(self):
+        options = wiseguy.html.OptionSet([('bar1', "Bar 1"), ('bar2', "Bar 2"), ('bar3', "Bar 3")])
+        expected = '''
+<select multiple id="foo" name="foo"><option selected value="bar1">Bar 1</option>
+<option value="bar2">Bar 2</option>
+<option selected value="bar3">Bar 3</option></select>
+        '''.strip()
+        result = wiseguy.jade_mixins.select(
+            'foo', options, selected=['bar1', 'bar3'], multiple=True).strip()
+        self.assertEqual(expected, result)
+        expected = '''
+<select id="foo" name="foo"><option value="bar1">Bar 1</option>
+<option value="bar2">Bar 2</option>
+<option value="bar3">Bar 3</option></select>
+        '''.strip()
+        result = wiseguy.jade_mixins.select('foo', options).strip()
+        self.assertEqual(expected, result)
+
+    def test_selected_strings_only(self):
+        options = [1, 2, 3]
+        expected = '''
+<select id="foo" name="foo"><option value="1">1</option>
+<option value="2">2</option>
+<option value="3">3</option></select>
+        '''.strip()
+        result = wiseguy.jade_mixins.select('foo', options, selected=3).strip()
+        self.assertEqual(expected, result)
+        result = wiseguy.jade_mixins.select('foo', options, selected="3").strip()
+        self.assertEqual(expected.replace('<option value="3">', '<option selected value="3">'), result)
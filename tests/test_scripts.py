@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 
+import os
 import sys
 
 import path
 
 import wiseguy.scripts.parse_jade
 import wiseguy.scripts.html2jade
+from wiseguy.scripts import batch
 
 
 def test_parse_jade():
@@ -25,6 +27,121 @@ def test_parse_jade():
             wiseguy.scripts.parse_jade.main()
         assert temp_html.text() == html_expected
 
+def test_parse_jade_batch():
+    with path.create_temp_dir() as temp_dir:
+        sub_dir = temp_dir.child("sub")
+        os.mkdir(sub_dir)
+        jade_files = [
+            temp_dir.child("a.jade"),
+            sub_dir.child("b.jade"),
+            sub_dir.child("c.jade")]
+        for f in jade_files:
+            f.write_text("html: body: div#%s" % f.namebase)
+        temp_dir.child("notes.txt").write_text("Not jade")
+
+        assert batch.find_files([temp_dir], "*.jade") == jade_files
+        assert batch.find_files([temp_dir.child("*.jade")], "*.jade") == jade_files[:1]
+
+        assert wiseguy.scripts.parse_jade.main(["-q", "-j", "2", temp_dir]) == 0
+        for f in jade_files:
+            assert '<div id="%s">' % f.namebase in f.parent.child(f.namebase + ".html").text()
+        assert not temp_dir.child("notes.html").exists()
+
+        results, skipped = batch.run(
+            wiseguy.scripts.parse_jade.convert,
+            jade_files,
+            wiseguy.scripts.parse_jade.output_for)
+        assert results == []
+        assert skipped == jade_files
+
+        mtime = os.path.getmtime(jade_files[1]) + 10
+        os.utime(jade_files[1], (mtime, mtime))
+        results, skipped = batch.run(
+            wiseguy.scripts.parse_jade.convert,
+            jade_files,
+            wiseguy.scripts.parse_jade.output_for,
+            workers=1)
+        assert [r[0] for r in results] == [jade_files[1]]
+        assert results[0][2] is None
+        assert skipped == [jade_files[0], jade_files[2]]
+
+def _copy(f_in, f_out):
+    path.path(f_out).write_text(path.path(f_in).text())
+
+def test_batch_no_overwrite():
+    with path.create_temp_dir() as temp_dir:
+        html_files = [temp_dir.child("a.html"), temp_dir.child("b.html")]
+        for f in html_files:
+            f.write_text("<p>%s</p>" % f.namebase)
+        jade = temp_dir.child("b.jade")
+        jade.write_text("p b")
+        mtime = os.path.getmtime(html_files[1]) + 10
+        os.utime(html_files[1], (mtime, mtime))
+        output_for = wiseguy.scripts.html2jade.output_for
+
+        results, skipped = batch.run(
+            _copy, html_files, output_for, workers=1, overwrite=False)
+        assert [r[0] for r in results] == [html_files[0]]
+        assert skipped == [html_files[1]]
+        assert jade.text() == "p b"
+
+        results, skipped = batch.run(
+            _copy, html_files, output_for, workers=1, force=True, overwrite=False)
+        assert [r[0] for r in results] == html_files
+        assert jade.text() == "<p>b</p>"
+
+def test_parse_jade_watcher():
+    with path.create_temp_dir() as temp_dir:
+        a = temp_dir.child("a.jade")
+        b = temp_dir.child("b.jade")
+        a.write_text("html: body: div#a")
+        b.write_text("html: body: div#b")
+        watcher = wiseguy.scripts.parse_jade.Watcher([temp_dir])
+        assert [r[0] for r in watcher.start()] == [a, b]
+        assert '<div id="b">' in temp_dir.child("b.html").text()
+        assert watcher.poll() == []
+        b_data = watcher._data[b]
+
+        a.write_text("html: body: div#changed")
+        mtime = os.path.getmtime(a) + 10
+        os.utime(a, (mtime, mtime))
+        assert [r[0] for r in watcher.poll()] == [a]
+        assert '<div id="changed">' in temp_dir.child("a.html").text()
+        assert watcher._data[b] is b_data
+
+        layout = temp_dir.child("layout.jade")
+        layout.write_text("html\n  body\n    block body")
+        page = temp_dir.child("page.jade")
+        page.write_text("extends layout\n\nappend body\n  div= loader('a.jade', {})")
+        assert watcher.scan() == set([layout, page])
+        assert watcher.affected([layout]) == [layout, page]
+        assert watcher.affected([a]) == [a, page]
+        assert watcher.affected([b]) == [b]
+
+def test_parse_jade_watcher_includes():
+    with path.create_temp_dir() as temp_dir:
+        site = temp_dir.child("site")
+        shared = temp_dir.child("shared")
+        os.mkdir(site)
+        os.mkdir(shared)
+        page = site.child("page.jade")
+        part = shared.child("part.jade")
+        inner = shared.child("inner.jade")
+        page.write_text("div= loader('../shared/part.jade', {}).next().text_content()")
+        part.write_text("p= loader('inner.jade', {}).next().text_content()")
+        inner.write_text("span inner")
+        watcher = wiseguy.scripts.parse_jade.Watcher([site])
+        assert [r[2] for r in watcher.start()] == [None]
+        assert 'inner' in site.child("page.html").text()
+        assert not os.path.exists(shared.child("part.html"))
+        assert watcher.directories() == set([site, shared])
+
+        inner.write_text("span changed")
+        mtime = os.path.getmtime(inner) + 10
+        os.utime(inner, (mtime, mtime))
+        assert [r[0] for r in watcher.poll()] == [page]
+        assert 'changed' in site.child("page.html").text()
+
 def test_html2jade():
     html_input = '''
 <html>
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 
+import lxml.html
+
 import wiseguy.template
+import wiseguy.transforms
 import wiseguy.html
 import wiseguy.utils
 
@@ -355,3 +358,248 @@ div
     span wobble
     span wibble''').normalise()
     assert result == expected
+
+def test_compile():
+    class template(wiseguy.template.Template):
+        element = wiseguy.html.Html(
+            "<html><head><title></title></head><body><div></div></body></html>")
+        transforms = [
+            wiseguy.template.Transform(
+                "head",
+                lambda head, template: template.element.add("head title", head)),
+            wiseguy.template.Transform(
+                "body",
+                lambda body, template: template.element.add("body div", wiseguy.html.Html("<p>%s</p>"%body)))]
+
+    plan = template.compile()
+    assert template.compile() is plan
+    assert len(plan.transforms) == 2
+
+    html = template.render(body="Foo").strip()
+    expected = """
+<html>
+<head><title></title></head>
+<body><div><p>Foo</p></div></body>
+</html>""".strip()
+    assert html == expected
+    assert template.compile() is plan
+
+    html = template.render().strip()
+    expected = """
+<html>
+<head><title></title></head>
+<body><div></div></body>
+</html>""".strip()
+    assert html == expected
+    assert html == plan.markup.strip()
+
+    template.element.set_attr("body div", "class", "main")
+    template.invalidate()
+    assert not template.compile() is plan
+    assert 'class="main"' in template.render()
+    plan = template.compile()
+
+    template.apply(dict(head="Flibble"))
+    assert not template.compile() is plan
+    html = template(dict(body="Bar")).to_string().strip()
+    expected = """
+<html>
+<head><title>Flibble</title></head>
+<body><div class="main"><p>Bar</p></div></body>
+</html>""".strip()
+    assert html == expected
+
+def test_transform_index():
+    calls = []
+    def record(name):
+        return lambda template, **kwargs: calls.append((name, sorted(kwargs.items())))
+    shared = wiseguy.template.Transform("b", record("shared"))
+
+    class template(wiseguy.template.Template):
+        element = wiseguy.html.Html("<div></div>")
+        transforms = [
+            wiseguy.template.Transform(("a", "b"), record("ab")),
+            wiseguy.template.Transform((), record("keyless")),
+            shared,
+            wiseguy.template.Transform("c", record("c")),
+            shared]
+
+    template.apply(dict(a=1))
+    assert calls == [("keyless", [])]
+    assert [t.keys for t in template.transforms] == [
+        set(["b"]), set(["b"]), set(["c"]), set(["b"])]
+
+    template.apply(dict(b=2, z=3))
+    assert calls[1:] == [
+        ("ab", [("a", 1), ("b", 2)]),
+        ("shared", [("b", 2)]),
+        ("shared", [("b", 2)])]
+    assert template.keys() == set(["c"])
+
+    template.apply(dict())
+    template.apply(dict(c=4))
+    assert calls[4:] == [("c", [("c", 4)])]
+    assert template.transforms == []
+
+    template.transforms.append(wiseguy.template.Transform("d", record("d")))
+    template.apply(dict(e=5))
+    template.transforms[0] = wiseguy.template.Transform("e", record("e"))
+    template.apply(dict(e=5))
+    assert calls[5:] == [("e", [("e", 5)])]
+    assert template.transforms == []
+
+def test_apply_add_widget():
+    class widget(wiseguy.template.Template):
+        element = wiseguy.html.Html("<p></p>")
+        transforms = [wiseguy.template.Transform(
+            "text", wiseguy.template.set_text("p", lambda text: text))]
+
+    class template(wiseguy.template.Template):
+        element = wiseguy.html.Html("<div><span></span></div>")
+        transforms = [
+            wiseguy.template.Transform(
+                "show",
+                lambda template, show: template.add_widget("span", widget))]
+
+    template.apply(dict(show=True))
+    assert template.keys() == set(["text"])
+    template.apply(dict(text="Hello"))
+    assert template.transforms == []
+    assert template.element.cssselect("span p")[0].text == "Hello"
+
+def test_transform_index_split():
+    first = wiseguy.template.Transform("a", None)
+    keyless = wiseguy.template.Transform((), None)
+    both = wiseguy.template.Transform(("a", "b"), None)
+    transforms = [first, keyless, both]
+    index = wiseguy.template.TransformIndex(transforms)
+
+    assert index.split(dict()) == ([keyless], [first, both])
+    assert index.split(dict(a=1)) == ([first, keyless], [both])
+    assert index.split(dict(a=1, b=2, c=3)) == ([first, keyless, both], [])
+    assert index.matches(transforms)
+    transforms[1] = first
+    assert not index.matches(transforms)
+
+def test_compile_folds_keyless():
+    calls = []
+    keyless = wiseguy.transforms.add_stylesheet("a.css")
+    add_link = keyless.action
+    keyless.action = lambda template: calls.append(add_link(template))
+    title = wiseguy.template.Transform(
+        "title", wiseguy.template.set_text("title", lambda title: title))
+
+    class template(wiseguy.template.Template):
+        element = wiseguy.html.Html(
+            "<html><head><title></title></head><body></body></html>")
+        transforms = [keyless, title]
+
+    assert template.describe() == dict(folded=[keyless], dynamic=[title])
+    assert len(calls) == 1
+    expected = """
+<html>
+<head>
+<title>%s</title>
+<link href="a.css" type="text/css" rel="stylesheet">
+</head>
+<body></body>
+</html>""".strip()
+    assert template.render().strip() == expected % ""
+    assert template.render(title="Foo").strip() == expected % "Foo"
+    assert template.render(title="Bar").strip() == expected % "Bar"
+    assert len(calls) == 1
+    assert template.element.cssselect("link") == []
+
+def test_compile_keeps_order():
+    def title_action(title, template):
+        head = template.element.cssselect("head")[0]
+        lxml.html.etree.SubElement(head, "title").text = title
+    add_title = wiseguy.template.Transform("title", title_action)
+    keyless = wiseguy.transforms.add_stylesheet("a.css")
+
+    class template(wiseguy.template.Template):
+        element = wiseguy.html.Html("<html><head></head><body></body></html>")
+        transforms = [add_title, keyless]
+
+    assert template.describe() == dict(folded=[], dynamic=[add_title, keyless])
+    html = template.render(title="Foo")
+    head = lxml.html.fromstring(html).find("head")
+    assert [el.tag for el in head] == ["title", "link"]
+
+def _skeleton_template():
+    class template(wiseguy.template.Template):
+        element = wiseguy.html.Html("""
+<html><head><title></title><meta charset="utf-8"></head>
+<body><div id="nav"><ul><li><a href="/">Home</a></li></ul></div>
+<h1></h1><p>Intro <b>text</b></p><div class="items"></div><pre>  keep
+  this</pre><img src="/logo.png">
+<!-- note --><div id="footer"><p>Footer</p></div></body></html>""")
+        transforms = [
+            wiseguy.template.Transform("title", wiseguy.template.set_text("title", lambda title: title)),
+            wiseguy.template.Transform("title", wiseguy.template.set_text("h1", lambda title: title)),
+            wiseguy.template.Transform("items", wiseguy.template.add(
+                ".items", lambda items: wiseguy.html.Html("<ul><li>%s</li></ul>" % items))),
+            wiseguy.template.Transform("more", wiseguy.template.replace(
+                "#footer p", lambda more: more)),
+            wiseguy.transforms.add_stylesheet("a.css")]
+    return template
+
+def test_compile_skeleton():
+    template = _skeleton_template()
+    plan = template.compile()
+    assert plan.skeleton is not None
+    assert plan.skeleton.cssselect("#nav a") == []
+    slots = plan.skeleton.cssselect("[data-wiseguy-slot]")
+    assert set(["div", "pre", "img"]) <= set(el.tag for el in slots)
+    assert len(plan.chunks) > 3
+
+    for context in [
+        dict(title="Foo"),
+        dict(title="Foo", items="Bar"),
+        dict(items="Bar", more="More")]:
+        copied = template.copy()
+        copied.apply(context)
+        expected = lxml.html.tostring(copied.element, pretty_print=True)
+        assert template.render(**context) == expected
+        assert lxml.html.tostring(template.render_lxml(context), pretty_print=True) == expected
+
+def test_compile_without_skeleton():
+    template = _skeleton_template()
+    template.transforms.append(wiseguy.transforms.fix_urls())
+    assert template.compile().skeleton is None
+    copied = template.copy()
+    copied.apply(dict(title="Foo", url=lambda path: "/root" + path))
+    assert template.render(title="Foo", url=lambda path: "/root" + path) == (
+        lxml.html.tostring(copied.element, pretty_print=True))
+
+def test_render_add_widget():
+    class widget(wiseguy.template.Template):
+        element = wiseguy.html.Html("<p>Widget</p>")
+        transforms = []
+
+    class template(wiseguy.template.Template):
+        element = wiseguy.html.Html("<div><span></span></div>")
+        transforms = [
+            wiseguy.template.Transform(
+                "show",
+                lambda template, show: template.add_widget("span", widget))]
+
+    html = template.render(show=True)
+    assert "<span><p>Widget</p></span>" in html
+    assert template.render() == "<div><span></span></div>\n"
+
+def test_invalidate_subclass():
+    class base(wiseguy.template.Template):
+        element = wiseguy.html.Html("<div><p></p></div>")
+        transforms = [wiseguy.template.Transform(
+            "text", wiseguy.template.set_text("p", lambda text: text))]
+
+    class sub(base):
+        pass
+
+    assert sub.render(text="a") == '<div><p>a</p></div>\n'
+    plan = sub.compile()
+    base.element.set_attr("div", "class", "x")
+    base.invalidate()
+    assert sub.compile() is not plan
+    assert sub.render(text="a") == '<div class="x"><p>a</p></div>\n'
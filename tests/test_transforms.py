@@ -77,3 +77,36 @@ html
 '''.strip()
     result = template.element.to_string().strip()
     assert result == expected
+
+def test_fix_urls_memo():
+    wiseguy.transforms._fixed_urls.clear()
+    element = wiseguy.html.Html(
+        '<div><a href="/a">A</a><a href="/a">A</a><img src="b.png"></div>')
+    wiseguy.transforms._fix_urls(element, werkzeug.Href("/one"))
+    assert wiseguy.transforms._fixed_urls.misses == 2
+    element = wiseguy.html.Html(
+        '<div><a href="/a">A</a><img src="b.png"></div>')
+    wiseguy.transforms._fix_urls(element, werkzeug.Href("/one"))
+    assert element.to_string(pretty=False) == (
+        '<div><a href="/one/a">A</a><img src="b.png"></div>')
+    assert wiseguy.transforms._fixed_urls.misses == 2
+    wiseguy.transforms._fix_urls(element, werkzeug.Href("/two"))
+    assert element.to_string(pretty=False) == (
+        '<div><a href="/two/one/a">A</a><img src="b.png"></div>')
+
+def test_fix_urls_memo_keys():
+    wiseguy.transforms._fixed_urls.clear()
+    for i in range(2):
+        element = wiseguy.html.Html('<div><a href="/a">A</a></div>')
+        wiseguy.transforms._fix_urls(element, werkzeug.Href("/one"))
+        assert element.to_string(pretty=False) == '<div><a href="/one/a">A</a></div>'
+    stats = wiseguy.transforms._fixed_urls.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+    prefix = ["/x"]
+    element = wiseguy.html.Html('<div><a href="/a">A</a></div>')
+    wiseguy.transforms._fix_urls(element, lambda path: prefix[0] + path)
+    prefix[0] = "/y"
+    element = wiseguy.html.Html('<div><a href="/a">A</a></div>')
+    wiseguy.transforms._fix_urls(element, lambda path: prefix[0] + path)
+    assert element.to_string(pretty=False) == '<div><a href="/y/a">A</a></div>'
+    assert len(wiseguy.transforms._fixed_urls) == 1
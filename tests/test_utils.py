@@ -99,3 +99,21 @@ def test_Prototype():
     assert callable(cg)
     assert cg("foo") == "Beeble Boople Lula"
     assert cg.flamble == "wotsit"
+
+def test_LRUCache():
+    cache = utils.LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "a" in cache
+    assert not "b" in cache
+    assert cache.get("b") is None
+    assert cache.get_or_create("d", lambda: 4) == 4
+    assert len(cache) == 2
+    assert cache.stats() == dict(
+        hits=1, misses=2, evictions=2, size=2, maxsize=2)
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()['hits'] == 0
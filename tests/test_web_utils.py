@@ -8,6 +8,7 @@ import werkzeug as wz
 import werkzeug.test
 import jinja2 as j2
 import validino as v
+import py.test
 
 import path
 
@@ -142,6 +143,10 @@ def test_JinjaEnv():
 
     assert env.from_string("foo").render() == "foo"
 
+    response = env.get_response("bar", dict(foo_var="flobble"), "text/html", stream=True)
+    assert response.is_streamed
+    assert response.data == "Foo Page flobble"
+
 def test_LxmlEnv():
     env = wu.LxmlEnv(
             utils.MockObject(
@@ -153,6 +158,29 @@ def test_LxmlEnv():
     response = env.get_response("bar", dict(foo_var="flibble"), "text/html")
     assert response.data.strip() == "<div>Foo Page flibble</div>"
 
+    response = env.get_response("bar", dict(foo_var="flobble"), "text/html", stream=True)
+    assert not response.is_streamed
+    assert response.data.strip() == "<div>Foo Page flobble</div>"
+
+def test_LxmlEnv_tidy():
+    env = wu.LxmlEnv(
+            utils.MockObject(
+                bar=lambda context: wiseguy.html.jade("div: p Foo Page %s"%context['foo_var'])),
+            tidy=True)
+    expected = '''
+<div>
+  <p>
+    Foo Page flibble
+  </p>
+</div>'''.strip()
+
+    html = env.render("bar", dict(foo_var="flibble"))
+    assert html == expected
+
+    response = env.get_response("bar", dict(foo_var="flibble"), "text/html", stream=True)
+    assert response.is_streamed
+    assert response.data == expected
+
 def test_JadeEnv():
     with path.create_temp_dir() as d:
         layout_content = """
@@ -194,6 +222,48 @@ append body
 </body></html>'''.strip()
         assert response.data.strip() == expected
 
+def test_JadeEnv_to_html():
+    import jade
+    with path.create_temp_dir() as d:
+        part_content = "p= part_var"
+        index_content = "!!! 5\nhtml\n  body\n    div= loader('part.jade', dict(part_var=part_var)).next().text_content()"
+        d.child('part.jade').write_text(part_content)
+        d.child('index.jade').write_text(index_content)
+        env = wu.JadeEnv(d)
+        context = dict(env.globals, part_var="Part")
+        expected = jade.to_html(index_content, context=context)
+        assert env.render("index", dict(part_var="Part")) == expected
+        assert env.render("index", dict(part_var="Part")) == expected
+        assert env.stats()['misses'] == 2
+
+def test_JadeEnv_cache():
+    with path.create_temp_dir() as d:
+        d.child('index.jade').write_text("div: p Flibble")
+        env = wu.JadeEnv(d)
+
+        assert env.render("index").strip() == "<div><p>Flibble</p></div>"
+        assert env.render("index").strip() == "<div><p>Flibble</p></div>"
+        stats = env.stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+        assert stats['size'] == 1
+        assert stats['hit_rate'] == 0.5
+
+        d.child('index.jade').write_text("div: p Flamble")
+        os.utime(d.child('index.jade'), (0, 0))
+        assert env.render("index").strip() == "<div><p>Flamble</p></div>"
+        assert env.stats()['misses'] == 2
+
+        env = wu.JadeEnv(d, production=True)
+        assert env.render("index").strip() == "<div><p>Flamble</p></div>"
+        d.child('index.jade').write_text("div: p Flooble")
+        os.utime(d.child('index.jade'), (1, 1))
+        assert env.render("index").strip() == "<div><p>Flamble</p></div>"
+        assert env.stats()['hits'] == 1
+
+        env.clear_cache()
+        assert env.render("index").strip() == "<div><p>Flooble</p></div>"
+
 def test_render():
     foo = lambda x: x
     mock_request = object()
@@ -263,6 +333,41 @@ def test_UrlMap():
     check_url(u"/test_callable", u"GET", '', u"This is a callable object")
 
 
+def test_UrlMap_static_routes():
+    url_map = wu.UrlMap()
+    url_map.expose('/foo', endpoint="foo")(lambda r: "Foo")
+    url_map.expose('/foo', methods=['POST'], endpoint="post_foo")(lambda r: "Post Foo")
+    url_map.expose('/bar/', endpoint="bar")(lambda r: "Bar")
+    url_map.expose('/<name>', endpoint="name")(lambda r, name: name)
+
+    assert url_map.match_static('', '/foo', 'GET').endpoint == "foo"
+    assert url_map.match_static('', '/foo', 'HEAD').endpoint == "foo"
+    assert url_map.match_static('', '//foo', 'GET').endpoint == "foo"
+    assert url_map.match_static('', '/foo', 'POST').endpoint == "post_foo"
+    assert url_map.match_static('', '/bar/', 'GET').endpoint == "bar"
+    assert url_map.match_static('', '/bar', 'GET') is None
+    assert url_map.match_static('', '/baz', 'GET') is None
+
+    adapter = url_map.bind_to_environ(utils.MockEnv("/foo", "POST"))
+    assert isinstance(adapter, wu.UrlMapAdapter)
+    assert adapter.match() == ("post_foo", {})
+    assert adapter.match("/baz", "GET") == ("name", {'name': "baz"})
+    with py.test.raises(wz.routing.RequestRedirect):
+        adapter.match("/bar", "GET")
+
+    adapter_2 = url_map.bind_to_environ(utils.MockEnv("/foo", "GET"))
+    assert adapter_2.match() == ("foo", {})
+    assert url_map._adapters.stats()['hits'] == 1
+
+    url_map.expose('/wibble', endpoint="wibble")(lambda r: "Wibble")
+    assert len(url_map._adapters) == 0
+    assert url_map.match_static('', '/wibble', 'GET').endpoint == "wibble"
+
+    environ = utils.MockEnv("/", "GET")
+    del environ['PATH_INFO']
+    with py.test.raises(wz.exceptions.NotFound):
+        url_map.bind_to_environ(environ).match()
+
 def test_UUIDConverter():
     url_map = wz.routing.Map([
         wz.routing.Rule("/<uuid:foo_id>", endpoint="foo")],
@@ -134,6 +134,44 @@ class TestPagination(unittest.TestCase):
         self.assertEqual(expected, result)
 
 
+    def test_window(self):
+        context = dict(offset=50, total=100, limit=5, url=url)
+        expected = '''
+<div class="pagination"><ul>
+<li class="prev"><a href="/item_type?offset=45">&#8592; Previous</a></li>
+<li><a href="/item_type?offset=0">1</a></li>
+<li class="disabled"><span>&#8230;</span></li>
+<li><a href="/item_type?offset=45">10</a></li>
+<li class="active"><a href="/item_type?offset=50">11</a></li>
+<li><a href="/item_type?offset=55">12</a></li>
+<li class="disabled"><span>&#8230;</span></li>
+<li><a href="/item_type?offset=95">20</a></li>
+<li class="next"><a href="/item_type?offset=55">Next &#8594;</a></li>
+</ul></div>
+'''.strip()
+        result = widgets.pagination(context, item_url, self.kwargs_filter, window=1).strip()
+        self.assertEqual(expected, result)
+
+    def test_window_near_start(self):
+        context = dict(offset=5, total=40, limit=5)
+        pages = widgets.PageState(context).window(1)
+        result = [page and page['page'] for page in pages]
+        self.assertEqual([1, 2, 3, None, 8], result)
+
+        context = dict(offset=10, total=40, limit=5)
+        pages = widgets.PageState(context).window(1)
+        result = [page and page['page'] for page in pages]
+        self.assertEqual([1, 2, 3, 4, None, 8], result)
+
+    def test_window_large(self):
+        context = dict(offset=1000000, total=2000000, limit=20)
+        pages = list(widgets.PageState(context).window(3))
+        result = [page and page['page'] for page in pages]
+        self.assertEqual(
+            [1, None, 49998, 49999, 50000, 50001, 50002, 50003, 50004, None, 100000],
+            result)
+        self.assertEqual(True, pages[5]['active'])
+
 class TestPagecounter(unittest.TestCase):
     def test_simple(self):
         context = dict(offset=0, total=25, limit=5)
@@ -3,10 +3,12 @@
 from collections import defaultdict
 from types import ClassType, FunctionType
 import datetime, itertools
+import multiprocessing.pool
+import sys
 import traceback
 
 import sqlalchemy as sa
-import sqlalchemy.interfaces
+import sqlalchemy.event
 
 from wiseguy import utils
 
@@ -22,26 +24,134 @@ class FixtureTeardownError(Exception):
     def __str__(self):
         return """%s\n\nOriginal Error was:\n%s""".strip() % (self.error, self.orig_error)
 
+class EntityInfo(object):
+    """What the fixture helpers need to know about a mapped class,
+    worked out once per mapper.
+
+    ``p_key_names`` are the names of the primary key columns,
+    ``column_names`` the names of the mapped columns, ``property_keys``
+    the names that can be set on an instance, ``column_keys`` maps
+    attribute names to keys of ``table``'s columns and ``tables`` are the
+    tables behind ``table``, which may be a join.
+    """
+    def __init__(self, mapper):
+        self.mapper = mapper
+        self.table = mapper.mapped_table
+        self.p_keys = list(mapper.primary_key)
+        self.p_key_names = [key.name for key in self.p_keys]
+        self.column_names = [c.name for c in mapper.columns if not c.name.startswith("%")]
+        self.property_keys = frozenset([prop.key for prop in mapper.iterate_properties])
+        self.column_keys = dict()
+        for prop in mapper.iterate_properties:
+            if isinstance(prop, sa.orm.ColumnProperty) and (len(prop.columns) == 1):
+                column = prop.columns[0]
+                if column.table is self.table:
+                    self.column_keys[prop.key] = column.key
+        if isinstance(self.table, sa.sql.expression.Join):
+            self.tables = [self.table.left, self.table.right]
+        else:
+            self.tables = [self.table]
+
+    def __repr__(self):
+        return "<EntityInfo %s>" % self.mapper.class_.__name__
+
+_entity_infos = dict()
+
+def entity_info(cls):
+    "The ``EntityInfo`` of the mapped class ``cls``"
+    mapper = cls._sa_class_manager.mapper
+    try:
+        return _entity_infos[mapper]
+    except KeyError:
+        info = _entity_infos[mapper] = EntityInfo(mapper)
+        return info
+
 def _get_primary_key_names(cls):
-    p_keys = cls._sa_class_manager.mapper.primary_key
-    p_key_names = [key.name for key in p_keys]
-    return p_key_names
+    return entity_info(cls).p_key_names
 
 def _get_from_data(cls, session, data):
-    p_key_names = _get_primary_key_names(cls)
-    p_key = [data[key_name] for key_name in p_key_names]
+    p_key = [data[key_name] for key_name in entity_info(cls).p_key_names]
     item = session.query(cls).get(p_key)
     return item
 
+def make_pkey_clause(columns, p_keys):
+    "A where clause matching any of ``p_keys``, a list of dicts, on ``columns``"
+    if len(columns) == 1:
+        column = columns[0]
+        return column.in_([p_key[column.name] for p_key in p_keys])
+    else:
+        return sa.or_(*[
+            sa.and_(*[column==p_key[column.name] for column in columns])
+            for p_key in p_keys])
+
+def _get_all_from_data(cls, session, data_list, batch_size=500):
+    "Fetch the items matching ``data_list``, keyed by primary key tuple"
+    info = entity_info(cls)
+    p_keys = info.p_keys
+    p_key_names = info.p_key_names
+    items = dict()
+    for data_batch in batch(data_list, max(1, batch_size // len(p_keys))):
+        q = session.query(cls).filter(make_pkey_clause(p_keys, data_batch))
+        for item in q:
+            items[tuple([getattr(item, name) for name in p_key_names])] = item
+    return items
+
+def _sort_by_table(entities):
+    "Sort (entity_class, data_class) pairs so that referenced tables come first"
+    def _position(entity):
+        table = entity_info(entity[0]).table
+        sorted_tables = getattr(table, 'metadata', None) and table.metadata.sorted_tables
+        if sorted_tables and (table in sorted_tables):
+            return sorted_tables.index(table)
+        else:
+            return len(sorted_tables or [])
+    return sorted(entities, key=_position)
+
+def _load_stages(entities, keep_constraints=True):
+    """Group (entity_class, data_class) pairs into stages that can each be
+    loaded concurrently, one task per entity class.
+
+    With ``keep_constraints`` an entity only comes after the entities of
+    every table it has a foreign key to, otherwise everything is one
+    stage.  Entities caught in a cycle get a stage each, in table order."""
+    tasks = defaultdict(list)
+    for entity_class, data_class in entities:
+        tasks[entity_class].append((entity_class, data_class))
+    if not keep_constraints:
+        return [tasks.values()]
+    tables = dict([
+        (entity_class, set(entity_info(entity_class).tables))
+        for entity_class in tasks])
+    all_tables = set().union(*tables.values())
+    references = dict()
+    for entity_class, own_tables in tables.items():
+        referenced = set([
+            foreign_key.column.table
+            for table in own_tables for foreign_key in table.foreign_keys])
+        references[entity_class] = (referenced & all_tables) - own_tables
+    stages = []
+    loaded = set()
+    remaining = [entity[0] for entity in _sort_by_table([(e, None) for e in tasks])]
+    while remaining:
+        stage = [e for e in remaining if references[e].issubset(loaded)]
+        if not stage:
+            stage = remaining[:1]
+        stages.append([tasks[e] for e in stage])
+        for entity_class in stage:
+            loaded.update(tables[entity_class])
+            remaining.remove(entity_class)
+    return stages
+
 def _create_item(cls, **kwargs):
     item = cls()
+    property_keys = entity_info(cls).property_keys
     for key, value in kwargs.items():
-        if item._sa_class_manager.mapper.has_property(key):
+        if key in property_keys:
             setattr(item, key, value)
     return item
 
 def _item_to_dict(item, **kwargs):
-    column_names = [c.name for c in item._sa_class_manager.mapper.columns if not c.name.startswith("%")]
+    column_names = entity_info(item.__class__).column_names
     d = dict([(k, getattr(item, k)) for k in column_names])
     for key, value in kwargs.items():
         d[key] = value
@@ -51,8 +161,9 @@ def _item_from_dict(item, d, **kwargs):
     data = {}
     data.update(d)
     data.update(kwargs)
+    property_keys = entity_info(item.__class__).property_keys
     for key, value in data.items():
-        if item._sa_class_manager.mapper.has_property(key):
+        if key in property_keys:
             setattr(item, key, value)
     return item
 
@@ -70,19 +181,25 @@ def get_data_from_bases(bases):
         data.update(get_data_from_class(b))
     return data
 
-def make_datum(_class, default_data, override_data, _entity_name):
+def _get_bases(_class):
     all_bases = tuple([_class] + list(_class.__bases__) + [object])
     bases = []
     for b in all_bases:
         if not b in bases:
             bases.append(b)
-    bases = tuple(bases)
+    return tuple(bases)
+
+def _merge_data(bases, default_data, override_data):
     data = get_data_from_bases(bases)
     for d_key in default_data:
         if not d_key in data:
             data[d_key] = default_data[d_key]
     for o_key in override_data:
         data[o_key] = override_data[o_key]
+    return data
+
+def _build_datum(_class, bases, data, _entity_name):
+    data = dict(data)
     for data_key, data_value in data.items():
         if callable(data_value):
             data[data_key] = data_value()
@@ -92,6 +209,87 @@ def make_datum(_class, default_data, override_data, _entity_name):
     datum = DatumMeta(_class.__name__, bases, data)
     return datum
 
+def make_datum(_class, default_data, override_data, _entity_name):
+    bases = _get_bases(_class)
+    data = _merge_data(bases, default_data, override_data)
+    return _build_datum(_class, bases, data, _entity_name)
+
+_merged_data = utils.LRUCache(maxsize=4096)
+
+def merge_data(_class, default_class=None, override_class=None):
+    """Return the bases of ``_class`` and its data merged with the data of
+    ``default_class`` and ``override_class``.  The result is memoised, so
+    callables in it are left for the caller to evaluate."""
+    key = (_class, default_class, override_class)
+    merged = _merged_data.get(key)
+    if merged is None:
+        bases = _get_bases(_class)
+        data = _merge_data(
+            bases,
+            get_data_from_class(default_class),
+            get_data_from_class(override_class))
+        merged = (bases, data)
+        _merged_data.set(key, merged)
+    return merged
+
+
+class PendingDatum(object):
+    """Stands in for a datum on a Data class until it is first used.
+
+    Getting the attribute (or iterating over the Data class) calls
+    ``factory`` to build the datum, which then replaces this placeholder.
+    """
+    def __init__(self, data_class, key, factory):
+        self.data_class = data_class
+        self.key = key
+        self.factory = factory
+        self.datum = None
+
+    def __repr__(self):
+        return "<PendingDatum %s.%s>" % (self.data_class.__name__, self.key)
+
+    def __get__(self, instance, owner):
+        return self.materialise()
+
+    def materialise(self):
+        if self.datum is None:
+            self.datum = self.factory()
+            setattr(self.data_class, self.key, self.datum)
+            if self.data_class._items.get(self.key, None) is self:
+                self.data_class._items[self.key] = self.datum
+        return self.datum
+
+
+def _resolve_datum(value):
+    if isinstance(value, PendingDatum):
+        return value.materialise()
+    else:
+        return value
+
+def _inherited_datum(data_class, key):
+    for base in data_class.__mro__[1:]:
+        if key in base.__dict__:
+            return getattr(base, key)
+    raise AttributeError(key)
+
+def _datum_factory(get_value, default_class, override_class,
+                   default_data, override_data, _entity_name):
+    # Existing datums get rebuilt whenever a Fixture or a subclass picks
+    # them up, so only their merges are worth memoising.
+    def factory():
+        value = _resolve_datum(get_value())
+        if isinstance(value, DatumMeta):
+            bases, data = merge_data(value, default_class, override_class)
+            return _build_datum(value, bases, data, _entity_name)
+        return make_datum(value, default_data, override_data, _entity_name)
+    return factory
+
+def _generated_datum_factory(v_name, v_dict, default_data, override_data, _entity_name):
+    def factory():
+        value_to_make = DatumMeta(v_name, (object,), v_dict)
+        return make_datum(value_to_make, default_data, override_data, _entity_name)
+    return factory
+
 
 class DataMeta(type):
     def __new__(meta_class, class_name, bases, class_dict):
@@ -100,8 +298,10 @@ class DataMeta(type):
             data_class._items = dict()
         else:
             data_class._items = dict(data_class._items)
-        default_data = get_data_from_class(class_dict.get('_default', None))
-        override_data = get_data_from_class(class_dict.get('_override', None))
+        default_class = class_dict.get('_default', None)
+        override_class = class_dict.get('_override', None)
+        default_data = get_data_from_class(default_class)
+        override_data = get_data_from_class(override_class)
         if not class_name == 'Data':
             _entity_name = (class_dict.get('_entity_name', None)
                             or getattr(data_class, '_entity_name', None)
@@ -114,52 +314,66 @@ class DataMeta(type):
             if not key.startswith("_"):
                 if class_dict.has_key(key):
                     value = class_dict[key]
+                    get_value = (lambda value=value: value)
                 else:
-                    value = getattr(data_class, key)
-                if isinstance(value, (ClassType, DatumMeta)):
-                    datum = make_datum(value, default_data, override_data, _entity_name)
+                    value = data_class._items[key]
+                    get_value = (lambda key=key: _inherited_datum(data_class, key))
+                if isinstance(value, (ClassType, DatumMeta, PendingDatum)):
+                    datum = PendingDatum(
+                        data_class,
+                        key,
+                        _datum_factory(
+                            get_value, default_class, override_class,
+                            default_data, override_data, _entity_name))
                     setattr(data_class, key, datum)
                     data_class._items[key] = datum
                 elif isinstance(value, FunctionType):
                     for v_name, v_dict in value():
-                        value_to_make = DatumMeta(v_name, (object,), v_dict)
-                        datum = make_datum(value_to_make, default_data, override_data, _entity_name)
+                        datum = PendingDatum(
+                            data_class,
+                            v_name,
+                            _generated_datum_factory(
+                                v_name, v_dict, default_data, override_data, _entity_name))
                         setattr(data_class, v_name, datum)
                         data_class._items[v_name] = datum
                     delattr(data_class, key)
 
         return data_class
 
+    def _datums(self):
+        for key, item in self._items.items():
+            yield _resolve_datum(item)
+
     def __iter__(self):
-        for item in self._items.values():
+        for item in self._datums():
             yield item
 
     def keys(self):
-        return set(self._items.values()).keys()
+        return set(self._datums()).keys()
 
     def items(self):
-        return self._items.items()
+        return [(key, _resolve_datum(item)) for (key, item) in self._items.items()]
 
     def __len__(self):
         return len(self._items.values())
 
     def __eq__(self, other):
-        return set(self._items.values()) == other
+        return set(self._datums()) == other
 
     def __ne__(self, other):
-        return not set(self._items.values()) == other
+        return not set(self._datums()) == other
 
     def __lt__(self, other):
-        return set(self._items.values()) < other
+        return set(self._datums()) < other
 
     def __le__(self, other):
-        return set(self._items.values()) <= other
+        return set(self._datums()) <= other
 
     def __gt__(self, other):
-        return set(self._items.values()) > other
+        return set(self._datums()) > other
 
     def __ge__(self, other):
-        return set(self._items.values()) >= other
+        return set(self._datums()) >= other
 
     def __repr__(self):
         return "<Data %s (%s)>" % (self.__name__, ", ".join([item.__name__ for item in self]))
@@ -202,7 +416,7 @@ class DatumMeta(type):
         for key in self.keys():
             item = getattr(self, key)
             data[key] = item
-        table = self._entity._sa_class_manager.mapper.mapped_table
+        table = entity_info(self._entity).table
         q = sa.insert(table).values(data)
         r = session.execute(q)
 
@@ -337,24 +551,116 @@ def get_primary_keys(table, data):
         p_keys[key.name] = data[key.name]
     return p_keys
 
+_bind_param_limits = dict(
+    sqlite=999,
+    mssql=2100,
+    oracle=1000,
+    postgresql=32767,
+    mysql=65535)
+
+def bind_param_limit(dialect):
+    "The most bind parameters ``dialect`` takes in one statement"
+    return _bind_param_limits.get(dialect.name, 999)
+
+def has_row_values(dialect):
+    "Can ``dialect`` match composite keys with a row value ``IN``?"
+    if dialect.name in ('postgresql', 'mysql'):
+        return True
+    if dialect.name == 'sqlite':
+        return dialect.dbapi.sqlite_version_info >= (3, 15)
+    return False
+
+def delete_rows(connection, table, p_keys):
+    """Delete the rows of ``table`` whose primary keys are in ``p_keys``, a
+    list of dicts, in as few statements as the dialect allows.
+
+    Single column keys are matched with ``IN``.  Composite keys are
+    matched with a row value ``IN`` where the dialect has one, and with
+    an ``OR`` of the keys elsewhere.  Every statement stays within the
+    dialect's bind parameter limit, and none of them is DDL, so the
+    deletes stay inside the caller's transaction."""
+    columns = [table.c[name] for name in p_keys[0]]
+    dialect = connection.dialect
+    limit = bind_param_limit(dialect)
+    if len(columns) == 1:
+        column = columns[0]
+        for p_key_batch in batch(p_keys, limit):
+            connection.execute(table.delete().where(
+                column.in_([p_key[column.name] for p_key in p_key_batch])))
+    elif has_row_values(dialect):
+        for p_key_batch in batch(p_keys, limit // len(columns)):
+            connection.execute(table.delete().where(
+                sa.tuple_(*columns).in_([
+                    sa.tuple_(*[p_key[column.name] for column in columns])
+                    for p_key in p_key_batch])))
+    else:
+        for p_key_batch in batch(p_keys, limit // len(columns)):
+            connection.execute(table.delete().where(
+                make_pkey_clause(columns, p_key_batch)))
+
 def get_pkeys_dict(entity_class, data):
-    p_key_names = [key.name for key in entity_class._sa_class_manager.mapper.primary_key]
+    p_key_names = entity_info(entity_class).p_key_names
     dicts = [dict([(key, item[key]) for key in p_key_names]) for item in data]
     return dicts
 
 
-class MyProxy(sa.interfaces.ConnectionProxy):
-    def __init__(self, tracker):
-        self.tracker = tracker
+class InsertTracker(object):
+    """Records the primary keys of the rows inserted through an engine.
+
+    Keys are kept per table in columnar form, one list of values per
+    primary key column, and every row of an executemany is recorded.
+    Statements other than inserts only cost an ``isinstance`` check.
+    """
+    def __init__(self):
+        self.tables = dict()
+
+    def attach(self, bind):
+        sa.event.listen(bind, 'after_execute', self._after_execute)
+        return self
+
+    def detach(self, bind):
+        # sa.event.remove() can't find the listeners of an engine in 0.7
+        bind.dispatch.after_execute.remove(self._after_execute, bind)
+
+    def _columns(self, table):
+        try:
+            return self.tables[table][1]
+        except KeyError:
+            names = [column.name for column in table.primary_key]
+            columns = [[] for column in table.primary_key]
+            self.tables[table] = (names, columns)
+            return columns
+
+    def _after_execute(self, conn, clauseelement, multiparams, params, result):
+        if not isinstance(clauseelement, sa.sql.expression.Insert):
+            return
+        context = result.context
+        table = clauseelement.table
+        columns = self._columns(table)
+        if context.executemany:
+            for key_column, values in zip(table.primary_key, columns):
+                key = key_column.key
+                values.extend([row.get(key, None) for row in context.compiled_parameters])
+        else:
+            for value, values in zip(context.inserted_primary_key, columns):
+                values.append(value)
 
-    def execute(self, conn, execute, clauseelement, *multiparams, **params):
-        if isinstance(clauseelement, sa.sql.expression.Insert):
-            table = clauseelement.table
-            data = clauseelement.parameters or {}
-            data.update(multiparams[0])
-            primary_keys = get_primary_keys(table, data)
-            self.tracker.setdefault(table, []).append(primary_keys)
-        return execute(clauseelement, *multiparams, **params)
+    def count(self, table):
+        "The number of rows inserted into ``table``"
+        columns = self.tables.get(table, (None, None))[1]
+        if columns:
+            return len(columns[0])
+        return 0
+
+    def primary_keys(self, table):
+        "The primary keys inserted into ``table``, as dicts"
+        if not table in self.tables:
+            return []
+        names, columns = self.tables[table]
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+    def clear(self):
+        self.tables.clear()
 
 
 class Fixture(object):
@@ -368,8 +674,8 @@ class Fixture(object):
         self._data = TesterManagerDataDict(self._data)
 
     def __enter__(self):
-        self.session = self._loader.session_factory()
         entity_classes, self._data_added, self._data_updated = self._loader.add_data(self._data)
+        self.session = self._loader.make_session()
         for entity_class in entity_classes:
             tester_class = self._loader._make_tester_class(entity_class, self.session)
             self._tester_classes.add(tester_class)
@@ -385,11 +691,11 @@ class Fixture(object):
             raise FixtureTeardownError(e, exc_type, value, traceback)
 
     def _add_data(self, overwrite_data=False, keep_constraints=False):
-        self.session = self._loader.session_factory()
         entity_classes, self._data_added, self._data_updated = self._loader.add_data(
             self._data,
             overwrite_data=overwrite_data,
             keep_constraints=keep_constraints)
+        self.session = self._loader.make_session()
         return self
 
     def _add_tester_class(self, key):
@@ -462,6 +768,9 @@ class BaseLoader(object):
         self.env = EnvWrapper(env)
         self.session_factory = session_factory
 
+    def make_session(self):
+        return self.session_factory()
+
     def _make_tester_class(self, entity_class, session):
         t_class_name = "%sTester" % entity_class.__name__
         t_base_name = "%sBase" % t_class_name
@@ -527,9 +836,130 @@ class MongoLoader(BaseLoader):
 
 
 class SQLAlchemyLoader(BaseLoader):
-    """A basic holder for an env and a session."""
-    def add_data(self, data, overwrite_data=True, keep_constraints=False):
-        session = self.session_factory()
+    """A basic holder for an env and a session.
+
+    With ``bulk=True`` existing rows are fetched with one ``IN`` query per
+    entity and new rows are inserted with one executemany per table,
+    instead of a ``query.get`` and an ORM add per row.  With ``workers``
+    above one, tables that don't depend on each other are loaded
+    concurrently on separate connections."""
+    def __init__(self, env, session_factory, bulk=False, workers=1):
+        super(SQLAlchemyLoader, self).__init__(env, session_factory)
+        self.bulk = bulk
+        self.workers = workers
+
+    def _add_item(self, session, entity_class, item_data, overwrite_data, data_added, data_updated):
+        item = _get_from_data(entity_class, session, item_data)
+        if item:
+            if overwrite_data:
+                data_updated[entity_class].append(_item_to_dict(item))
+                _item_from_dict(item, item_data)
+                session.add(item)
+        else:
+            item = _create_item(entity_class, **item_data)
+            session.add(item)
+            data_added[entity_class].append(_item_to_dict(item))
+
+    def _bulk_add_items(self, session, entity_class, items_data, overwrite_data, data_added, data_updated):
+        info = entity_info(entity_class)
+        table = info.table
+        if not isinstance(table, sa.Table):
+            for item_data in items_data:
+                self._add_item(session, entity_class, item_data, overwrite_data, data_added, data_updated)
+            return
+        p_key_names = info.p_key_names
+        column_keys = info.column_keys
+        column_names = info.column_names
+        existing = _get_all_from_data(entity_class, session, items_data)
+        rows_by_keys = defaultdict(list)
+        for item_data in items_data:
+            p_key = tuple([item_data[name] for name in p_key_names])
+            item = existing.get(p_key, None)
+            if item:
+                if overwrite_data:
+                    data_updated[entity_class].append(_item_to_dict(item))
+                    _item_from_dict(item, item_data)
+                    session.add(item)
+            else:
+                row = dict([
+                    (column_keys[key], value) for (key, value) in item_data.items()
+                    if key in column_keys])
+                rows_by_keys[frozenset(row.keys())].append(row)
+                data_added[entity_class].append(
+                    dict([(name, item_data.get(name, None)) for name in column_names]))
+        for rows in rows_by_keys.values():
+            session.execute(table.insert(), rows)
+
+    def _load_task(self, entities, overwrite_data, bulk):
+        "Load (entity_class, items_data) pairs on a session of their own"
+        session = self.make_session()
+        data_added = defaultdict(list)
+        data_updated = defaultdict(list)
+        try:
+            with no_autoflush(session):
+                for entity_class, items_data in entities:
+                    if bulk:
+                        self._bulk_add_items(
+                            session, entity_class, items_data, overwrite_data, data_added, data_updated)
+                    else:
+                        for item_data in items_data:
+                            self._add_item(
+                                session, entity_class, item_data, overwrite_data, data_added, data_updated)
+                session.commit()
+        finally:
+            session.close()
+        return data_added, data_updated
+
+    def _parallel_add(self, entities, overwrite_data, keep_constraints, bulk, workers,
+                      data_added, data_updated):
+        # Pending datums aren't safe to build from several threads, so
+        # every row is built here before any work goes to the pool.
+        items = dict(
+            (data_class, [datum.to_dict() for datum in data_class])
+            for (entity_class, data_class) in entities)
+        failure = None
+        for stage in _load_stages(entities, keep_constraints):
+            pool = multiprocessing.pool.ThreadPool(min(workers, len(stage)))
+            try:
+                results = [
+                    pool.apply_async(self._load_task, (
+                        [(entity_class, items[data_class]) for (entity_class, data_class) in task],
+                        overwrite_data,
+                        bulk))
+                    for task in stage]
+                for result in results:
+                    try:
+                        task_added, task_updated = result.get()
+                    except Exception:
+                        if failure is None:
+                            failure = sys.exc_info()
+                        continue
+                    for entity_class, rows in task_added.items():
+                        data_added[entity_class].extend(rows)
+                    for entity_class, rows in task_updated.items():
+                        data_updated[entity_class].extend(rows)
+            finally:
+                pool.close()
+                pool.join()
+            if failure is not None:
+                # The other tasks have committed, undo them before failing
+                self.delete_data(data_added)
+                self.restore_data(data_updated, bulk)
+                raise failure[0], failure[1], failure[2]
+
+    def add_data(self, data, overwrite_data=True, keep_constraints=False, bulk=None, workers=None):
+        """Load ``data``, returning the entity classes loaded and the rows
+        added and overwritten.
+
+        With ``workers`` above one, entity classes whose tables don't
+        reference each other are loaded at the same time, each on a
+        session and connection of its own, by up to ``workers`` threads.
+        Each of those sessions commits separately."""
+        if bulk is None:
+            bulk = self.bulk
+        if workers is None:
+            workers = self.workers
+        session = self.make_session()
         entity_classes = set()
         data_added = defaultdict(list)
         data_updated = defaultdict(list)
@@ -539,79 +969,190 @@ class SQLAlchemyLoader(BaseLoader):
             constraint_checker = NoConstraints
         with constraint_checker(session):
             with no_autoflush(session):
-                for data_class in data.values():
-                    entity_class = self.env[data_class._entity_name]
-                    entity_classes.add(entity_class)
-                    for datum in data_class:
-                        item_data = datum.to_dict()
-                        item = _get_from_data(entity_class, session, item_data)
-                        if item:
-                            if overwrite_data:
-                                data_updated[entity_class].append(_item_to_dict(item))
-                                _item_from_dict(item, item_data)
-                                session.add(item)
-                        else:
-                            item = _create_item(entity_class, **item_data)
-                            session.add(item)
-                            data_added[entity_class].append(_item_to_dict(item))
+                if workers > 1:
+                    entities = []
+                    for data_class in data.values():
+                        entity_class = self.env[data_class._entity_name]
+                        entity_classes.add(entity_class)
+                        entities.append((entity_class, data_class))
+                    self._parallel_add(
+                        entities, overwrite_data, keep_constraints, bulk, workers,
+                        data_added, data_updated)
+                elif bulk:
+                    entities = []
+                    for data_class in data.values():
+                        entity_class = self.env[data_class._entity_name]
+                        entity_classes.add(entity_class)
+                        entities.append((entity_class, data_class))
+                    for entity_class, data_class in _sort_by_table(entities):
+                        items_data = [datum.to_dict() for datum in data_class]
+                        self._bulk_add_items(
+                            session, entity_class, items_data, overwrite_data, data_added, data_updated)
+                else:
+                    for data_class in data.values():
+                        entity_class = self.env[data_class._entity_name]
+                        entity_classes.add(entity_class)
+                        for datum in data_class:
+                            item_data = datum.to_dict()
+                            self._add_item(
+                                session, entity_class, item_data, overwrite_data, data_added, data_updated)
                 session.commit()
         session.close()
         return (entity_classes, data_added, data_updated)
 
     def _process_data(self, data_to_process):
-        items = [
-            (entity_class._sa_class_manager.mapper.mapped_table, get_pkeys_dict(entity_class, data))
-            for (entity_class, data) in data_to_process.items()]
         processed_items = []
-
-        def process_item(table, p_keys):
-            # Break joins into seperate tables
-            result = []
-            if isinstance(table, sqlalchemy.types.expression.Join):
-                for join_table in [table.left, table.right]:
-                    data = [dict(
+        for entity_class, data in data_to_process.items():
+            tables = entity_info(entity_class).tables
+            p_keys = get_pkeys_dict(entity_class, data)
+            if len(tables) == 1:
+                processed_items.append((tables[0], p_keys))
+            else:
+                # Break joins into seperate tables
+                for join_table in tables:
+                    join_p_keys = [dict(
                         [(key, datum[key]) for key in datum
                          if hasattr(join_table.c, key)]) for datum in p_keys]
-                    result.append((join_table, data))
-            else:
-                result.append((table, p_keys))
-            return result
-
-        for table, p_keys in items:
-            processed_items.extend(process_item(table, p_keys))
-
+                    processed_items.append((join_table, join_p_keys))
         return processed_items
 
     def delete_data(self, data_added):
-        session = self.session_factory()
+        session = self.make_session()
 
         processed_items = self._process_data(data_added)
 
         with NoConstraints(session):
             with no_autoflush(session):
+                connection = session.connection()
                 for table, p_key_list in processed_items:
-                    for p_keys in batch(p_key_list, 100):
-                        clauses = [make_whereclause(table, p_key) for p_key in p_keys]
-                        where_clause = sa.or_(*clauses)
-                        q = table.delete().where(where_clause)
-                        session.execute(q)
+                    if p_key_list:
+                        delete_rows(connection, table, p_key_list)
                 session.commit()
             session.close()
 
-    def restore_data(self, data_updated):
-        session = self.session_factory()
+    def _restore_items(self, session, entity_class, data_list):
+        info = entity_info(entity_class)
+        p_key_names = info.p_key_names
+        property_keys = info.property_keys
+        items = _get_all_from_data(entity_class, session, data_list)
+        for original_data in data_list:
+            item = items.get(tuple([original_data[name] for name in p_key_names]), None)
+            assert item
+            for key, value in original_data.items():
+                if key in property_keys:
+                    setattr(item, key, value)
+
+    def _bulk_restore_items(self, session, entity_class, data_list):
+        info = entity_info(entity_class)
+        table = info.table
+        if not isinstance(table, sa.Table):
+            self._restore_items(session, entity_class, data_list)
+            return
+        column_keys = info.column_keys
+        p_keys = [(name, table.c[name]) for name in info.p_key_names]
+        rows = []
+        for original_data in data_list:
+            row = dict([
+                (column_keys[key], value) for (key, value) in original_data.items()
+                if key in column_keys])
+            for name, column in p_keys:
+                row["_pk_%s" % column.key] = original_data[name]
+            rows.append(row)
+        where_clause = sa.and_(*[
+            column==sa.bindparam("_pk_%s" % column.key) for (name, column) in p_keys])
+        session.execute(table.update().where(where_clause), rows)
+
+    def restore_data(self, data_updated, bulk=None):
+        """Put back the rows that ``add_data`` overwrote.
+
+        Each entity's rows are fetched with one query.  With ``bulk``
+        they aren't fetched at all, each table gets one executemany
+        ``UPDATE``."""
+        if bulk is None:
+            bulk = self.bulk
+        session = self.make_session()
 
         with no_autoflush(session):
             with NoConstraints(session):
                 for entity_class, data_list in data_updated.items():
-                    for original_data in data_list:
-                        item = _get_from_data(entity_class, session, original_data)
-                        assert item
-                        _item_from_dict(item, original_data)
+                    if not data_list:
+                        continue
+                    if bulk:
+                        self._bulk_restore_items(session, entity_class, data_list)
+                    else:
+                        self._restore_items(session, entity_class, data_list)
                 session.commit()
         session.close()
 
 
+class TransactionalLoader(SQLAlchemyLoader):
+    """A SQLAlchemyLoader that loads each fixture inside a transaction
+    and rolls it back on teardown, instead of deleting the added rows and
+    restoring the updated ones.
+
+    The outermost fixture opens a connection and begins a transaction on
+    it, nested fixtures begin a SAVEPOINT.  Every session the loader
+    makes, including the fixture's tester session, is bound to that
+    connection, so it sees the uncommitted data.  ``bind`` defaults to
+    the bind of ``session_factory``.
+
+    Nested fixtures need a driver with working SAVEPOINTs, which the
+    stock pysqlite driver doesn't have."""
+    def __init__(self, env, session_factory, bulk=False, bind=None):
+        super(TransactionalLoader, self).__init__(env, session_factory, bulk=bulk)
+        self.bind = bind
+        self._connection = None
+        self._transactions = []
+
+    def make_session(self):
+        if self._connection is None:
+            return self.session_factory()
+        else:
+            return self.session_factory(bind=self._connection)
+
+    def _get_bind(self):
+        if self.bind is not None:
+            return self.bind
+        session = self.session_factory()
+        bind = session.bind
+        session.close()
+        return bind
+
+    def _begin(self):
+        if self._connection is None:
+            self._connection = self._get_bind().connect()
+            self._transactions.append(self._connection.begin())
+        else:
+            self._transactions.append(self._connection.begin_nested())
+
+    def _rollback(self):
+        transaction = self._transactions.pop()
+        transaction.rollback()
+        if not self._transactions:
+            self._connection.close()
+            self._connection = None
+
+    def add_data(self, data, overwrite_data=True, keep_constraints=False, bulk=None, workers=None):
+        # Every session shares the one connection, so load on one thread
+        self._begin()
+        try:
+            return super(TransactionalLoader, self).add_data(
+                data,
+                overwrite_data=overwrite_data,
+                keep_constraints=keep_constraints,
+                bulk=bulk,
+                workers=1)
+        except:
+            self._rollback()
+            raise
+
+    def delete_data(self, data_added):
+        self._rollback()
+
+    def restore_data(self, data_updated):
+        pass
+
+
 def batch(items, count):
     "Return the items in groups of count"
     items = iter(items)
@@ -1,13 +1,38 @@
 # -*- coding: utf-8 -*-
 
 import jinja2 as j2
+import lxml.etree
 import lxml.html
 from lxml.html import builder as html
 
+import wiseguy.html
 from wiseguy import utils
 
 _default = object()
 
+_skeletons = utils.LRUCache(maxsize=1024)
+
+def _from_skeleton(key, build):
+    """Return a copy of the element ``build`` returns, with whatever it
+    returns alongside.  The build only happens once per ``key``; only the
+    parts that vary between calls should be filled in on the copy."""
+    skeleton = _skeletons.get(key)
+    if skeleton is None:
+        skeleton = build()
+        _skeletons.set(key, skeleton)
+    element, extra = skeleton
+    # lxml copies the whole subtree; this skips copy.deepcopy's memo.
+    return element.__deepcopy__(None), extra
+
+def _cacheable(*values):
+    "Can ``values`` go in a skeleton key?"
+    for value in values:
+        if not isinstance(value, basestring):
+            return False
+    return True
+
+_error_spans = lxml.etree.XPath("//span[contains(@class, 'error')]")
+
 def add_errors(context, element, id):
     "Add an error, if present, to the list of elements"
     if context.get('errors', None):
@@ -18,39 +43,42 @@ def add_errors(context, element, id):
                     {'class': 'error'}))
 
 
+def _build_bootstrap(fieldset_class):
+    element = html.FIELDSET(
+        html.DIV(
+            {'class': 'controls'}),
+        {'class': fieldset_class},
+        )
+    return element, None
+
+
 def _boostrapise(func, context, id, class_=None, controls_length=1, **kwargs):
     elements = func(context=context, id=id, **kwargs)
     label = elements[0]
     rest = elements[1:]
     label.attrib['class'] = "control-label"
-    input = html.DIV(
-        {'class': 'controls'},
-        *rest)
     fieldset_classes = ['control-group']
     if context.get('errors', None):
         if context['errors'].get(id, ''):
             fieldset_classes.append("error")
     if class_:
         fieldset_classes.append(class_)
-    element = html.FIELDSET(
-        label,
-        input,
-        {'class': " ".join(fieldset_classes)},
-        )
-    help = element.xpath("//span[contains(@class, 'error')]")
+    fieldset_class = " ".join(fieldset_classes)
+    element, _ = _from_skeleton(
+        ('bootstrap', fieldset_class),
+        lambda: _build_bootstrap(fieldset_class))
+    element.insert(0, label)
+    input = element[1]
+    for el in rest:
+        input.append(el)
+    help = _error_spans(element)
     if help:
         help[0].attrib['class'] = help[0].attrib['class'] + ' help-inline'
     return element
 
 
-def _input(context, id, label, input_type, value=_default, class_=None, extra_attrs=None):
-    if value is _default:
-        value = unicode((context.get('data', False) or {}).get(id, ''))
-    if not extra_attrs:
-        extra_attrs = dict()
-    if class_:
-        extra_attrs['class'] = class_
-    if context.get('disabled_form', False):
+def _build_input(id, label, input_type, extra_attrs, disabled):
+    if disabled:
         element = html.DIV(
             html.LABEL(
                 label,
@@ -60,7 +88,7 @@ def _input(context, id, label, input_type, value=_default, class_=None, extra_at
                 type=input_type,
                 name=id,
                 id=id,
-                value=value,
+                value=u"",
                 disabled="disabled"))
     else:
         element = html.DIV(
@@ -72,7 +100,26 @@ def _input(context, id, label, input_type, value=_default, class_=None, extra_at
                 type=input_type,
                 name=id,
                 id=id,
-                value=value))
+                value=u""))
+    return element, None
+
+
+def _input(context, id, label, input_type, value=_default, class_=None, extra_attrs=None):
+    if value is _default:
+        value = unicode((context.get('data', False) or {}).get(id, ''))
+    if not extra_attrs:
+        extra_attrs = dict()
+    if class_:
+        extra_attrs['class'] = class_
+    disabled = bool(context.get('disabled_form', False))
+    if _cacheable(id, label, input_type, *extra_attrs.values()):
+        key = ('input', id, label, input_type, tuple(sorted(extra_attrs.items())), disabled)
+        element, _ = _from_skeleton(
+            key,
+            lambda: _build_input(id, label, input_type, extra_attrs, disabled))
+    else:
+        element, _ = _build_input(id, label, input_type, extra_attrs, disabled)
+    element[1].attrib['value'] = value
     add_errors(context, element, id)
     return element
 
@@ -147,20 +194,14 @@ def datepicker(context, id, label):
     return '\n'.join(elements)
 
 
-def _textarea(context, id, label):
-    data = context.get('data', False) or {}
-    text = data.get(id, '')
-    if isinstance(text, str):
-        text = text.decode('utf8')
-    else:
-        text = unicode(text)
-    if context.get('disabled_form', False):
+def _build_textarea(id, label, disabled):
+    if disabled:
         element = html.DIV(
             html.LABEL(
                 label,
                 {'for': id}),
             html.TEXTAREA(
-                text,
+                u"",
                 name=id,
                 id=id,
                 disabled="disabled",
@@ -171,10 +212,28 @@ def _textarea(context, id, label):
                 label,
                 {'for': id}),
             html.TEXTAREA(
-                text,
+                u"",
                 name=id,
                 id=id,
                 ))
+    return element, None
+
+
+def _textarea(context, id, label):
+    data = context.get('data', False) or {}
+    text = data.get(id, '')
+    if isinstance(text, str):
+        text = text.decode('utf8')
+    else:
+        text = unicode(text)
+    disabled = bool(context.get('disabled_form', False))
+    if _cacheable(id, label):
+        element, _ = _from_skeleton(
+            ('textarea', id, label, disabled),
+            lambda: _build_textarea(id, label, disabled))
+    else:
+        element, _ = _build_textarea(id, label, disabled)
+    element[1].text = text
     add_errors(context, element, id)
     return element
 
@@ -302,53 +361,58 @@ def wysihtml5(context, id, label):
     return html.DIV(*elements)
 
 
-def _select(context, id, label, options, disabled, blank_option):
+def _build_select(id, label, option_set, disabled, blank_option, multiple):
     option_elements = []
-    selected = unicode((context.get('data', False) or {}).get(id, ''))
     if blank_option:
         o = html.OPTION(value="")
         option_elements.append(o)
-    for option in options:
-        if isinstance(option, (list, tuple)):
-            value, text = option
-        else:
-            value, text = (option, option)
-        value = unicode(value)
-        text = unicode(text)
-        if value == selected:
-            o = html.OPTION(text, value=value, selected="selected")
-        else:
-            o = html.OPTION(text, value=value)
+    for value, text in option_set:
+        o = html.OPTION(text, value=value)
         option_elements.append(o)
-    if disabled or context.get('disabled_form', False):
-        element = html.DIV(
-            html.LABEL(
-                label,
-                {'for': id}),
-            html.SELECT(
-                "\n",
-                *option_elements,
-                name=id,
-                id=id,
-                disabled="disabled"))
+    select_attrs = dict(name=id, id=id)
+    if disabled:
+        select_attrs['disabled'] = "disabled"
+    if multiple:
+        select_attrs['multiple'] = "multiple"
+    element = html.DIV(
+        html.LABEL(
+            label,
+            {'for': id}),
+        html.SELECT(
+            "\n",
+            *option_elements,
+            **select_attrs))
+    return element, None
+
+
+def _select(context, id, label, options, disabled, blank_option, multiple=False):
+    selected = (context.get('data', False) or {}).get(id, '')
+    option_set = wiseguy.html.OptionSet.from_options(options)
+    disabled = bool(disabled or context.get('disabled_form', False))
+    blank_option = bool(blank_option)
+    multiple = bool(multiple)
+    if _cacheable(id, label):
+        element, _ = _from_skeleton(
+            ('select', id, label, option_set, disabled, blank_option, multiple),
+            lambda: _build_select(id, label, option_set, disabled, blank_option, multiple))
     else:
-        element = html.DIV(
-            html.LABEL(
-                label,
-                {'for': id}),
-            html.SELECT(
-                "\n",
-                *option_elements,
-                name=id,
-                id=id))
+        element, _ = _build_select(id, label, option_set, disabled, blank_option, multiple)
+    select = element[1]
+    offset = int(blank_option)
+    for index in option_set.selected_indexes(selected):
+        value, text = option_set.options[index]
+        select.replace(
+            select[index + offset],
+            html.OPTION(text, value=value, selected="selected"))
     add_errors(context, element, id)
     return element
 
 
 @j2.contextfunction
-def select(context, id, label, options, disabled=False, blank_option=True):
-    "A select element.  Accepts a list of value, text pairs"
-    return _select(context, id, label, options, disabled, blank_option)
+def select(context, id, label, options, disabled=False, blank_option=True, multiple=False):
+    """A select element.  Accepts a list of value, text pairs, or a
+    ``wiseguy.html.OptionSet``"""
+    return _select(context, id, label, options, disabled, blank_option, multiple)
 
 
 @j2.contextfunction
@@ -412,7 +476,7 @@ class BootstrapFormFields(object):
         return element
 
     @j2.contextfunction
-    def select(self, context, id, label, options, disabled=False, blank_option=True):
+    def select(self, context, id, label, options, disabled=False, blank_option=True, multiple=False):
         "A Bootstrap input element"
         return _boostrapise(
             _select,
@@ -421,7 +485,8 @@ class BootstrapFormFields(object):
             label=label,
             options=options,
             disabled=disabled,
-            blank_option=blank_option)
+            blank_option=blank_option,
+            multiple=multiple)
 
     @j2.contextfunction
     def checkbox(self, context, id, label, value=_default):
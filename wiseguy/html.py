@@ -3,23 +3,60 @@
 import types
 import copy
 
-import lxml.html, lxml.builder
+import lxml.html, lxml.builder, lxml.cssselect
 
 import wiseguy.utils
 import wiseguy.html_tidy
 
 
+selector_cache = wiseguy.utils.LRUCache(maxsize=512)
+
+def compile_selector(path):
+    "Return a compiled ``CSSSelector`` for ``path``, shared across the process"
+    return selector_cache.get_or_create(
+        path,
+        lambda: lxml.cssselect.CSSSelector(path, translator='html'))
+
+
+def _placements(targets, el, move=False):
+    "Pair each target with a copy of ``el``, or ``el`` itself for the last when moving"
+    last = len(targets) - 1
+    for i, target in enumerate(targets):
+        if move and (i == last):
+            yield target, el
+        else:
+            yield target, copy.deepcopy(el)
+
+
 class HtmlElement(lxml.html.HtmlElement):
+    def cssselect(self, expr, translator='html'):
+        if translator == 'html':
+            return compile_selector(expr)(self)
+        else:
+            return super(HtmlElement, self).cssselect(expr, translator=translator)
+
     def to_string(self, pretty=True, tidy=False):
         if tidy:
             return wiseguy.html_tidy.tidy_html(self)
         else:
             return lxml.html.tostring(self, pretty_print=pretty)
 
+    def iter_string(self, pretty=True, tidy=False, chunk_size=8192):
+        """Yield the markup in chunks.  Only tidy output is streamed, lxml
+        serialises a tree in one piece, so without ``tidy`` the whole
+        document is the one chunk."""
+        if tidy:
+            return wiseguy.html_tidy.iter_tidy_html(self, chunk_size=chunk_size)
+        else:
+            return iter([lxml.html.tostring(self, pretty_print=pretty)])
+
     def normalise(self):
         return wiseguy.html_tidy.normalise_html(self)
 
-    def add(self, path, text_or_el, index=None):
+    def add(self, path, text_or_el, index=None, move=False):
+        """Add text or an element to the elements matching ``path``.  With
+        ``move``, the element itself goes into the last match, and only the
+        other matches get copies; the caller must not reuse it."""
         if path:
             elements = self.cssselect(path)
         else:
@@ -33,14 +70,14 @@ class HtmlElement(lxml.html.HtmlElement):
                 else:
                     el.text = (el.text or '') + text_or_el
         else:
-            for el in elements:
-                sub_el = copy.deepcopy(text_or_el)
+            for el, sub_el in _placements(elements, text_or_el, move):
                 if index is None:
                     el.append(sub_el)
                 else:
                     el.insert(index, sub_el)
 
-    def replace(self, path, text_or_el):
+    def replace(self, path, text_or_el, move=False):
+        "Replace the elements matching ``path``.  ``move`` is as for ``add``"
         elements = self.cssselect(path)
         if isinstance(text_or_el, (str, unicode)):
             for el in elements:
@@ -54,8 +91,7 @@ class HtmlElement(lxml.html.HtmlElement):
                 else:
                     parent.text = (parent.text or '') + text_or_el
         else:
-            for el in elements:
-                sub_el = copy.deepcopy(text_or_el)
+            for el, sub_el in _placements(elements, text_or_el, move):
                 super(lxml.html.HtmlElement, el.getparent()).replace(el, sub_el)
 
     def set_attr(self, path, attr, value):
@@ -124,10 +160,49 @@ class HtmlElementLookup(lxml.html.HtmlElementClassLookup):
 parser = lxml.html.HTMLParser()
 parser.set_element_class_lookup(HtmlElementLookup())
 
-def Html(src):
+parse_cache = None
+
+def enable_parse_cache(maxsize=1024):
+    """Cache the trees parsed by ``Html`` and ``jade``, keyed by their
+    source, and hand out copies of them.
+
+    Copies are detached from the document they were parsed into, so
+    ``getparent()`` on a parsed fragment returns ``None``.
+    """
+    global parse_cache
+    parse_cache = wiseguy.utils.LRUCache(maxsize)
+    return parse_cache
+
+def disable_parse_cache():
+    global parse_cache
+    parse_cache = None
+
+def parse_cache_stats():
+    "The hit, miss and eviction counts of the parse cache, if it is enabled"
+    if parse_cache is None:
+        return None
+    return parse_cache.stats()
+
+def _cached_parse(cache, key, parse, *args):
+    try:
+        element = cache.get(key, None)
+    except TypeError:
+        return parse(*args)
+    if element is None:
+        element = parse(*args)
+        cache.set(key, element)
+    return element.__deepcopy__(None)
+
+def _html(src):
     return lxml.html.fromstring(src, parser=parser)
 
-def jade(src, context=None):
+def Html(src):
+    cache = parse_cache
+    if cache is None:
+        return _html(src)
+    return _cached_parse(cache, ('html', src), _html, src)
+
+def _jade(src, context):
     import jade as Jade
     import wiseguy.jade_mixins
     new_context = dict(wiseguy.jade_mixins.mixins)
@@ -136,6 +211,16 @@ def jade(src, context=None):
     elements = Jade.to_elements(src, context=new_context)
     return elements.next()
 
+def jade(src, context=None):
+    cache = parse_cache
+    if cache is None:
+        return _jade(src, context)
+    if context:
+        key = ('jade', src, tuple(sorted(context.items())))
+    else:
+        key = ('jade', src, ())
+    return _cached_parse(cache, key, _jade, src, context)
+
 def add_generator(elem, item):
     for i in item:
         if isinstance(i, (types.ListType, types.TupleType)):
@@ -153,3 +238,92 @@ _HTMLBuilder = lxml.builder.ElementMaker(
 class HtmlBuilder(object):
     def __getattr__(self, key):
         return getattr(_HTMLBuilder, key.lower())
+
+
+def _selected_values(selected):
+    if isinstance(selected, (list, tuple, set, frozenset)):
+        return [unicode(value) for value in selected]
+    else:
+        return [unicode(selected)]
+
+class OptionSet(object):
+    """The options of a select element, normalised once.
+
+    ``options`` is a list of values, or of (value, text) pairs.  Build an
+    OptionSet once for an option list that is rendered repeatedly; its
+    markup is serialised on first use, and selecting values only swaps
+    in the selected options.
+    """
+    def __init__(self, options):
+        pairs = []
+        positions = dict()
+        for option in options:
+            if isinstance(option, (list, tuple)):
+                value, text = option
+            else:
+                value, text = (option, option)
+            value = unicode(value)
+            positions.setdefault(value, []).append(len(pairs))
+            pairs.append((value, unicode(text)))
+        self.options = tuple(pairs)
+        self.positions = positions
+        self._hash = None
+        self._markup = None
+        self._selected_markup = dict()
+
+    @classmethod
+    def from_options(cls, options):
+        if isinstance(options, cls):
+            return options
+        return cls(options)
+
+    def __repr__(self):
+        return "<OptionSet (%s options)>" % len(self.options)
+
+    def __len__(self):
+        return len(self.options)
+
+    def __iter__(self):
+        return iter(self.options)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(self.options)
+        return self._hash
+
+    def __eq__(self, other):
+        return isinstance(other, OptionSet) and (self.options == other.options)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def selected_indexes(self, selected):
+        """The positions of the options whose value is ``selected``, or
+        one of the values in ``selected``"""
+        indexes = []
+        for value in _selected_values(selected):
+            indexes.extend(self.positions.get(value, ()))
+        return indexes
+
+    def option(self, index, selected=False):
+        value, text = self.options[index]
+        if selected:
+            return _HTMLBuilder.option(text, value=value, selected="selected")
+        else:
+            return _HTMLBuilder.option(text, value=value)
+
+    def markup(self, selected=()):
+        "A list of the serialised options, with the ``selected`` ones selected"
+        if self._markup is None:
+            self._markup = [
+                lxml.html.tostring(self.option(i)) for i in xrange(len(self.options))]
+        lines = self._markup
+        indexes = self.selected_indexes(selected)
+        if indexes:
+            lines = list(lines)
+            for index in indexes:
+                if not index in self._selected_markup:
+                    self._selected_markup[index] = lxml.html.tostring(
+                        self.option(index, selected=True))
+                lines[index] = self._selected_markup[index]
+        return lines
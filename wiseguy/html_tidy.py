@@ -4,6 +4,8 @@ import re
 
 import lxml.html
 
+from wiseguy import utils
+
 
 whitespace_re = re.compile("\s+")
 
@@ -35,7 +37,7 @@ def _render_close_tag(el):
     return "</%s>" % (el.tag)
 
 def _render_attrs(el):
-    return "".join([' %s="%s"'%(k, el.attrib[k]) for k in sorted(el.keys())])
+    return "".join([' %s="%s"' % item for item in sorted(el.items())])
 
 def _render_content(el):
     if el.text:
@@ -45,22 +47,26 @@ def _render_content(el):
             yield line
 
 def _render_el(el, indent_level=1):
-    if el.tag == "html":
-        yield "<!DOCTYPE html>"
-    if isinstance(el, lxml.html.HtmlComment):
-        yield str(el)
-    else:
-        yield _render_open_tag(el)
-        if el.text:
-            yield el.text.encode('ascii', 'xmlcharrefreplace')
-        for sub_element in el:
-            for line in _render_el(sub_element, indent_level=indent_level+1):
-                yield line
-        if not el.tag in lxml.html.defs.empty_tags:
+    "The markup of ``el`` as a flat run of tags and text"
+    empty_tags = lxml.html.defs.empty_tags
+    stack = [(el, False)]
+    while stack:
+        el, closing = stack.pop()
+        if not closing:
+            if el.tag == "html":
+                yield "<!DOCTYPE html>"
             if not isinstance(el, lxml.html.HtmlComment):
-                yield _render_close_tag(el)
-    if el.tail:
-        yield el.tail.encode('ascii', 'xmlcharrefreplace')
+                yield _render_open_tag(el)
+                if el.text:
+                    yield el.text.encode('ascii', 'xmlcharrefreplace')
+                stack.append((el, True))
+                stack.extend([(sub_element, False) for sub_element in reversed(el)])
+                continue
+            yield str(el)
+        elif not el.tag in empty_tags:
+            yield _render_close_tag(el)
+        if el.tail:
+            yield el.tail.encode('ascii', 'xmlcharrefreplace')
 
 def has_inline_content(el):
     for sub_element in el:
@@ -102,19 +108,96 @@ def _render_block_tag(el, indent_level=0):
     if el.tail:
         yield "  "*indent_level + el.tail
 
+def _render_inline(el):
+    return whitespace_re.sub(' ', "".join(_render_el(el)).replace('\n', ''))
+
 def _render_el_tidy(el, indent_level=1, with_doctype=True):
-    if el.tag == "html":
-        if with_doctype:
-            yield "<!DOCTYPE html>"
-    if el.tag in inline_tags:
-        yield _render_inline_tag(el).next()
-    else:
-        for line in _render_block_tag(el):
-            if line.strip():
-                yield line
+    """The tidied lines of ``el``.
+
+    Block tags put their content on lines of its own, indented two
+    spaces, and inline tags are rendered on one line.  The tree is
+    walked with a stack rather than a generator per level, so deep
+    documents cost no more per element than shallow ones.
+    """
+    empty_tags = lxml.html.defs.empty_tags
+    root = el
+    stack = [(el, "", False)]
+    while stack:
+        el, indent, closing = stack.pop()
+        if closing:
+            if not el.tag in empty_tags:
+                yield indent + _render_close_tag(el)
+            if el.tail and el.tail.strip():
+                yield indent + el.tail
+            continue
+        if (el.tag == "html") and (with_doctype or (el is not root)):
+            yield indent + "<!DOCTYPE html>"
+        if el.tag in inline_tags:
+            yield indent + _render_inline(el)
+            continue
+        if is_empty(el):
+            if not el.tag in empty_tags:
+                yield indent + _render_open_tag(el) + _render_close_tag(el)
+            else:
+                yield indent + _render_open_tag(el)
+        elif isinstance(el, lxml.html.HtmlComment):
+            yield indent + str(el)
+        else:
+            yield indent + _render_open_tag(el)
+            sub_indent = indent + "  "
+            if has_inline_content(el):
+                content = "".join([_render_inline(sub_element) for sub_element in el])
+                if el.text:
+                    content = el.text.encode('ascii', 'xmlcharrefreplace') + content
+                content = content.strip()
+                if content:
+                    yield sub_indent + content
+            else:
+                if el.text:
+                    text = el.text.encode('ascii', 'xmlcharrefreplace')
+                    if text.strip():
+                        yield sub_indent + text
+                stack.append((el, indent, True))
+                stack.extend([
+                    (sub_element, sub_indent, False)
+                    for sub_element in reversed(el)])
+                continue
+            if not el.tag in empty_tags:
+                yield indent + _render_close_tag(el)
+        if el.tail and el.tail.strip():
+            yield indent + el.tail
+
+def _join_lines(lines):
+    lines = iter(lines)
+    for line in lines:
+        yield line
+        break
+    for line in lines:
+        yield "\n"
+        yield line
+
+def _normalised_lines(el):
+    for item in _render_el(el):
+        item = item.strip()
+        if item:
+            yield item
 
 def normalise_html(el):
-    return "\n".join([item.strip() for item in _render_el(el) if item.strip()])
+    return "\n".join(_normalised_lines(el))
 
 def tidy_html(el, with_doctype=True):
     return u"\n".join(_render_el_tidy(el, with_doctype=with_doctype))
+
+def iter_normalised_html(el, chunk_size=8192, encoding='utf-8'):
+    "Like ``normalise_html`` but yields encoded chunks of ``chunk_size`` bytes"
+    return utils.iter_chunks(
+        _join_lines(_normalised_lines(el)),
+        chunk_size,
+        encoding)
+
+def iter_tidy_html(el, with_doctype=True, chunk_size=8192, encoding='utf-8'):
+    "Like ``tidy_html`` but yields encoded chunks of ``chunk_size`` bytes"
+    return utils.iter_chunks(
+        _join_lines(_render_el_tidy(el, with_doctype=with_doctype)),
+        chunk_size,
+        encoding)
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+import wiseguy.html
 from wiseguy import html_tags as ht
 
 
@@ -9,27 +10,28 @@ def register(func):
     mixins[func.__name__] = func
     return func
 
+_blank_option = ht.OPTION(value="").to_string(pretty=False)
+
 @register
-def select(id, options, selected=None, blank_option=False):
-    option_elements = []
+def select(id, options, selected=None, blank_option=False, multiple=False):
+    "A select element.  ``options`` may be a list or a ``wiseguy.html.OptionSet``"
+    option_set = wiseguy.html.OptionSet.from_options(options)
+    if multiple:
+        element = ht.SELECT(
+            name=id,
+            id=id,
+            multiple="multiple")
+    else:
+        element = ht.SELECT(
+            name=id,
+            id=id)
+    markup = element.to_string()
+    split = markup.rindex("</select>")
+    if not isinstance(selected, (list, tuple, set, frozenset)):
+        selected = (selected,)
+    # Option values are strings, and other values never matched them
+    selected = [value for value in selected if isinstance(value, basestring)]
+    lines = option_set.markup(selected)
     if blank_option:
-        o = ht.OPTION(value="")
-        option_elements.append(o)
-    for option in options:
-        if isinstance(option, (list, tuple)):
-            value, text = option
-        else:
-            value, text = (option, option)
-        value = unicode(value)
-        text = unicode(text)
-        if value == selected:
-            o = ht.OPTION(text, value=value, selected="selected")
-        else:
-            o = ht.OPTION(text, value=value)
-        print repr(value), repr(text)
-        option_elements.append(o)
-    element = ht.SELECT(
-        *option_elements,
-        name=id,
-        id=id)
-    return element.to_string()
+        lines = [_blank_option] + lines
+    return markup[:split] + "\n".join(lines) + markup[split:]
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""Run a file conversion over many files in a pool of processes.
+
+Arguments can be files, directories (searched for files matching the
+script's pattern) or globs.  Files whose output is newer than their
+input are skipped unless ``--force`` is given.  Scripts whose outputs
+could be hand-written sources, such as html2jade, never replace an
+existing output without ``--force``.
+"""
+
+import fnmatch, glob, multiprocessing, optparse, os, sys, time, traceback
+
+
+def _is_glob(arg):
+    return any(c in arg for c in "*?[")
+
+def find_files(args, pattern):
+    "Expand files, directories and globs in ``args`` into a list of files"
+    found = []
+    for arg in args:
+        if os.path.isdir(arg):
+            for dir_path, dir_names, file_names in os.walk(arg):
+                dir_names.sort()
+                for file_name in sorted(fnmatch.filter(file_names, pattern)):
+                    found.append(os.path.join(dir_path, file_name))
+        elif _is_glob(arg):
+            found.extend(sorted(glob.glob(arg)))
+        else:
+            found.append(arg)
+    seen = set()
+    files = []
+    for f in found:
+        if not f in seen:
+            seen.add(f)
+            files.append(f)
+    return files
+
+def is_stale(f_in, f_out):
+    "Does ``f_out`` need (re)making from ``f_in``?"
+    if not os.path.exists(f_out):
+        return True
+    return os.path.getmtime(f_out) < os.path.getmtime(f_in)
+
+def _convert(task):
+    convert, f_in, f_out = task
+    start = time.time()
+    try:
+        convert(f_in, f_out)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    return f_in, time.time() - start, error
+
+def run(convert, files, output_for, workers=None, force=False, report=None,
+        overwrite=True):
+    """Call ``convert(f_in, f_out)`` for each stale file, across ``workers``
+    processes.  Returns the (file, seconds, error) results and the list
+    of skipped files.  With ``overwrite`` false, files whose output
+    exists are skipped however old it is, unless ``force`` is given."""
+    tasks = []
+    skipped = []
+    for f_in in files:
+        f_out = output_for(f_in)
+        if not (overwrite or force) and os.path.exists(f_out):
+            skipped.append(f_in)
+        elif force or is_stale(f_in, f_out):
+            tasks.append((convert, f_in, f_out))
+        else:
+            skipped.append(f_in)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    results = []
+    if (workers > 1) and (len(tasks) > 1):
+        pool = multiprocessing.Pool(min(workers, len(tasks)))
+        try:
+            for result in pool.imap_unordered(_convert, tasks):
+                if report:
+                    report(result)
+                results.append(result)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for task in tasks:
+            result = _convert(task)
+            if report:
+                report(result)
+            results.append(result)
+    return results, skipped
+
+def _report(result):
+    f_in, seconds, error = result
+    if error:
+        print "%8.3fs  %s FAILED\n%s" % (seconds, f_in, error)
+    else:
+        print "%8.3fs  %s" % (seconds, f_in)
+
+def main(convert, output_for, pattern, argv=None, watch=None, overwrite=True):
+    """Parse the command line and run ``convert`` over the files it names.
+    Returns the number of files that failed.
+
+    If ``watch`` is given the script gains a ``--watch`` option, which
+    hands over to ``watch(args, options, report)`` to keep the outputs up
+    to date until it is interrupted.  ``overwrite`` is passed on to
+    ``run``."""
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = optparse.OptionParser(
+        usage="%prog [options] FILE|DIR|GLOB ...",
+        description=__doc__.strip().splitlines()[0])
+    parser.add_option("-j", "--jobs", type="int", default=None,
+                      help="number of worker processes (default: one per CPU)")
+    parser.add_option("-f", "--force", action="store_true", default=False,
+                      help="convert files even if their output is up to date")
+    parser.add_option("-q", "--quiet", action="store_true", default=False,
+                      help="only print failures and the summary")
+    if watch:
+        parser.add_option("-w", "--watch", action="store_true", default=False,
+                          help="keep running, rebuilding files as they change")
+        parser.add_option("--interval", type="float", default=0.5,
+                          help="seconds between checks when inotify is unavailable")
+    options, args = parser.parse_args(argv)
+    files = find_files(args, pattern)
+    start = time.time()
+    if options.quiet:
+        report = lambda result: result[2] and _report(result)
+    else:
+        report = _report
+    if watch and options.watch:
+        watch(args, options, report)
+        return 0
+    results, skipped = run(
+        convert,
+        files,
+        output_for,
+        workers=options.jobs,
+        force=options.force,
+        report=report,
+        overwrite=overwrite)
+    elapsed = time.time() - start
+    failed = [r for r in results if r[2]]
+    work = sum(r[1] for r in results)
+    print "Converted %s files in %.2fs (%.2fs of work), skipped %s up to date, %s failed" % (
+        len(results) - len(failed), elapsed, work, len(skipped), len(failed))
+    if results:
+        slowest = max(results, key=lambda r: r[1])
+        print "Slowest: %s (%.3fs)" % (slowest[0], slowest[1])
+    return len(failed)
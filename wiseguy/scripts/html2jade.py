@@ -7,16 +7,21 @@ import path
 
 import wiseguy.html2jade
 import wiseguy.html
+from wiseguy.scripts import batch
 
 
-def main():
-    args = sys.argv[1:]
-    for arg in args:
-        f_in = path.path(arg)
-        f_out = f_in.parent.child(f_in.namebase + ".jade")
-        html_content = f_in.text('utf8')
-        jade_content = wiseguy.html2jade.html2jade(html_content)
-        f_out.write_text(jade_content, 'utf8')
+def output_for(f_in):
+    f_in = path.path(f_in)
+    return f_in.parent.child(f_in.namebase + ".jade")
+
+def convert(f_in, f_out):
+    html_content = path.path(f_in).text('utf8')
+    jade_content = wiseguy.html2jade.html2jade(html_content)
+    path.path(f_out).write_text(jade_content, 'utf8')
+
+def main(argv=None):
+    # A .jade file next to the .html may be the source it was made from
+    return batch.main(convert, output_for, "*.html", argv, overwrite=False)
 
 if __name__ == '__main__':
-    print main()
+    sys.exit(main())
@@ -1,22 +1,219 @@
 #! python
 # -*- coding: utf-8 -*-
 
+import os
+import re
 import sys
+import time
+import traceback
+import types
 
 import path
 
 import wiseguy.html_tidy
 import wiseguy.html
+from wiseguy.scripts import batch
 
 
-def main():
-    args = sys.argv[1:]
-    for arg in args:
-        f_in = path.path(arg)
-        f_out = f_in.parent.child(f_in.namebase + ".html")
-        jade_content = f_in.text('utf8')
-        html_content = wiseguy.html_tidy.tidy_html(wiseguy.html.jade(jade_content))
-        f_out.write_text(html_content, 'utf8')
+def output_for(f_in):
+    f_in = path.path(f_in)
+    return f_in.parent.child(f_in.namebase + ".html")
+
+def convert(f_in, f_out):
+    jade_content = path.path(f_in).text('utf8')
+    html_content = wiseguy.html_tidy.tidy_html(wiseguy.html.jade(jade_content))
+    path.path(f_out).write_text(html_content, 'utf8')
+
+_dependency_re = re.compile(
+    r'''^\s*(?:extends|include)\s+(\S+)|loader\(\s*['"]([^'"]+)['"]''',
+    re.MULTILINE)
+
+def dependencies(f_in, src):
+    "The files that the jade source ``src`` of ``f_in`` extends or includes"
+    directory = os.path.dirname(f_in)
+    deps = set()
+    for extended, loaded in _dependency_re.findall(src):
+        name = extended or loaded
+        if not os.path.splitext(name)[1]:
+            name = name + ".jade"
+        deps.add(os.path.normpath(os.path.join(directory, name)))
+    return deps
+
+class Watcher(object):
+    """Rebuilds the ``.jade`` files under ``args`` as they change.
+
+    Each file's parsed data is kept in memory and only re-parsed when the
+    file changes.  A change rebuilds the file itself and every file that
+    extends or includes it, directly or indirectly.  Files that are
+    included from outside ``args`` are watched as well.
+    """
+    def __init__(self, args, force=False, report=None):
+        self.args = args
+        self.force = force
+        self.report = report
+        self._watched = set()
+        self._stamps = dict()
+        self._deps = dict()
+        self._data = dict()
+
+    def _forget(self, f):
+        del self._stamps[f]
+        self._deps.pop(f, None)
+        self._data.pop(f, None)
+
+    def scan(self):
+        """Stat the watched files and everything they depend on, returning
+        the set that are new, changed or gone"""
+        files = set(os.path.normpath(f) for f in batch.find_files(self.args, "*.jade"))
+        changed = self._watched - files
+        self._watched = files
+        tracked = set(files)
+        pending = list(files)
+        while pending:
+            f = pending.pop()
+            try:
+                st = os.stat(f)
+            except OSError:
+                if f in self._stamps:
+                    self._forget(f)
+                    changed.add(f)
+                continue
+            stamp = (st.st_mtime, st.st_size)
+            if self._stamps.get(f) != stamp:
+                self._stamps[f] = stamp
+                self._data.pop(f, None)
+                self._deps[f] = dependencies(f, path.path(f).text('utf8'))
+                changed.add(f)
+            for dep in self._deps[f]:
+                if dep not in tracked:
+                    tracked.add(dep)
+                    pending.append(dep)
+        for f in set(self._stamps) - tracked:
+            self._forget(f)
+            changed.add(f)
+        return changed
+
+    def directories(self):
+        "The directories holding the files that are being tracked"
+        return set(os.path.dirname(os.path.abspath(f)) for f in self._stamps)
+
+    def affected(self, changed):
+        "The watched files that are in ``changed`` or depend on them"
+        dependants = dict()
+        for f, deps in self._deps.items():
+            for dep in deps:
+                dependants.setdefault(dep, set()).add(f)
+        affected = set()
+        pending = list(changed)
+        while pending:
+            f = pending.pop()
+            if f in affected:
+                continue
+            affected.add(f)
+            pending.extend(dependants.get(f, ()))
+        return sorted(f for f in affected if f in self._watched)
+
+    def _get_data(self, f):
+        data = self._data.get(f, None)
+        if data is None:
+            import jade
+            data = jade.generate_data(path.path(f).text('utf8'))
+            if isinstance(data, types.GeneratorType):
+                data = list(data)
+            self._data[f] = data
+        return data
+
+    def _generate(self, f, context):
+        "Render ``f``, resolving its includes relative to its own directory"
+        import jade
+        f = os.path.normpath(f)
+        directory = os.path.dirname(f)
+        def loader(filename, context):
+            return self._generate(os.path.join(directory, filename), context)
+        context = dict(context)
+        context['loader'] = loader
+        return jade.generate_elements(self._get_data(f), context=context)
+
+    def render(self, f_in):
+        import wiseguy.jade_mixins
+        elements = self._generate(f_in, wiseguy.jade_mixins.mixins)
+        return wiseguy.html_tidy.tidy_html(iter(elements).next())
+
+    def rebuild(self, files):
+        "Regenerate the output of each of ``files``, returning batch style results"
+        results = []
+        for f_in in files:
+            start = time.time()
+            try:
+                html_content = self.render(f_in)
+                path.path(output_for(f_in)).write_text(html_content, 'utf8')
+                error = None
+            except Exception:
+                error = traceback.format_exc()
+            result = (f_in, time.time() - start, error)
+            if self.report:
+                self.report(result)
+            results.append(result)
+        return results
+
+    def start(self):
+        "Take the first scan and build anything that is out of date"
+        self.scan()
+        return self.rebuild([
+            f for f in sorted(self._watched)
+            if self.force or batch.is_stale(f, output_for(f))])
+
+    def poll(self):
+        "Rebuild whatever has changed since the last scan"
+        return self.rebuild(self.affected(self.scan()))
+
+    def _wait(self, interval):
+        try:
+            import pyinotify
+        except ImportError:
+            while True:
+                time.sleep(interval)
+                yield
+        manager = pyinotify.WatchManager()
+        mask = (pyinotify.IN_CLOSE_WRITE | pyinotify.IN_MOVED_TO |
+                pyinotify.IN_CREATE | pyinotify.IN_DELETE)
+        for arg in self.args:
+            if os.path.isdir(arg):
+                manager.add_watch(
+                    os.path.abspath(arg), mask, rec=True, auto_add=True)
+        watching = set()
+        notifier = pyinotify.Notifier(
+            manager, default_proc_fun=pyinotify.ProcessEvent(), timeout=None)
+        try:
+            while True:
+                for directory in self.directories() - watching:
+                    if manager.get_wd(directory) is None:
+                        manager.add_watch(directory, mask)
+                    watching.add(directory)
+                if notifier.check_events():
+                    notifier.read_events()
+                    notifier.process_events()
+                    yield
+        finally:
+            notifier.stop()
+
+    def run(self, interval=0.5):
+        "Rebuild changed files until interrupted"
+        self.start()
+        try:
+            for _ in self._wait(interval):
+                results = self.poll()
+                if results:
+                    print "Rebuilt %s files in %.1fms" % (
+                        len(results), sum(r[1] for r in results) * 1000)
+        except KeyboardInterrupt:
+            pass
+
+def watch(args, options, report):
+    Watcher(args, force=options.force, report=report).run(options.interval)
+
+def main(argv=None):
+    return batch.main(convert, output_for, "*.jade", argv, watch=watch)
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-import collections, copy, functools, contextlib
+import bisect, collections, copy, functools, contextlib, re
 
 import lxml.html
 
@@ -34,6 +34,295 @@ class Transform(object):
         return Transform(new_keys, self.action, new_context)
 
 
+class TransformIndex(object):
+    """The pending transforms of a template, indexed by the context keys
+    they wait on.
+
+    Each entry in the template's list gets a sequence number, so
+    applying a context only looks at the transforms waiting on one of
+    its keys, plus the keyless transforms, and runs them in list order.
+    """
+    def __init__(self, transforms):
+        self.transforms = transforms
+        self.snapshot = tuple(transforms)
+        self.seqs = range(len(transforms))
+        self.entries = dict()
+        self.by_key = collections.defaultdict(list)
+        self.keyless = []
+        for seq, transform in enumerate(transforms):
+            self.entries[seq] = transform
+            if transform.keys:
+                for key in transform.keys:
+                    self.by_key[key].append(seq)
+            else:
+                self.keyless.append(seq)
+
+    def __repr__(self):
+        return "<TransformIndex (%s transforms)>" % len(self.seqs)
+
+    def matches(self, transforms):
+        "Is this index still valid for ``transforms``?"
+        return (transforms is self.transforms) and (tuple(transforms) == self.snapshot)
+
+    def waiting_on(self, context):
+        "The sequence numbers of the transforms affected by ``context``"
+        if not context:
+            return list(self.keyless)
+        found = set(self.keyless)
+        if len(context) < len(self.by_key):
+            for key in context:
+                found.update(self.by_key.get(key, ()))
+        else:
+            for key, seqs in self.by_key.iteritems():
+                if key in context:
+                    found.update(seqs)
+        return sorted(found)
+
+    def _unindex(self, seq, keys):
+        for key in keys:
+            waiting = self.by_key[key]
+            waiting.remove(seq)
+            if not waiting:
+                del self.by_key[key]
+
+    def update(self, done, replaced):
+        """Drop the transforms in ``done`` and swap in the partly applied
+        ones in ``replaced``, keeping their place in the list."""
+        for seq in reversed(done):
+            transform = self.entries.pop(seq)
+            if transform.keys:
+                self._unindex(seq, transform.keys)
+            else:
+                self.keyless.remove(seq)
+            position = bisect.bisect_left(self.seqs, seq)
+            del self.seqs[position]
+            del self.transforms[position]
+        for seq, transform in replaced.iteritems():
+            self._unindex(seq, self.entries[seq].keys - transform.keys)
+            self.entries[seq] = transform
+            self.transforms[bisect.bisect_left(self.seqs, seq)] = transform
+        # Not the list itself, an action may have added transforms to it
+        # that were never indexed
+        self.snapshot = tuple(self.entries[seq] for seq in self.seqs)
+
+    def split(self, context):
+        """The transforms whose keys are all in ``context``, and the rest,
+        both in list order.  The rest is only built if something is ready."""
+        ready = []
+        for seq in self.waiting_on(context):
+            transform = self.entries[seq]
+            if transform.keys.issubset(context):
+                ready.append(seq)
+        if not ready:
+            return [], self.transforms
+        done = set(ready)
+        pending = [self.entries[seq] for seq in self.seqs if seq not in done]
+        return [self.entries[seq] for seq in ready], pending
+
+
+_slot_attribute = "data-wiseguy-slot"
+_slot_re = re.compile(r'<([^\s>/]+) %s="(\d+)">(?:[^<]*</\1>)?' % _slot_attribute)
+# Sibling combinators and pseudo classes can depend on elements the
+# skeleton leaves out
+_unsafe_path_re = re.compile(r'[+~:()]')
+
+def _new_template(element, transforms):
+    return TemplateMeta(
+        'Template',
+        (Template,),
+        dict(
+            element=element,
+            transforms=transforms))
+
+class _Rendering(object):
+    """What a transform's action is given as ``template`` during a render.
+
+    It holds the copied element and the pending transforms, and only
+    builds a template class around them, which is slow, when the action
+    uses more of the ``TemplateMeta`` interface, such as ``add_widget``.
+    """
+    __slots__ = ('element', 'transforms', '_template')
+
+    def __init__(self, element, transforms):
+        self.element = element
+        self.transforms = transforms
+        self._template = None
+
+    def __getattr__(self, name):
+        if self._template is None:
+            self._template = _new_template(self.element, self.transforms)
+        return getattr(self._template, name)
+
+# Bumped by every ``invalidate``, so plans only look at the versions
+# along the mro when something may have changed
+_invalidations = [0]
+
+def _versions(template):
+    return tuple(owner.__dict__.get('_version', 0) for owner in template.__mro__)
+
+
+class RenderPlan(object):
+    """A template compiled for repeated rendering.
+
+    The plan keeps its own copy of the template's element, and the
+    transforms in the order they need to run.  Keyless transforms, such
+    as ``add_stylesheet``, at the head of the list are folded into that
+    copy when the plan is built, so they cost nothing per render.  Those
+    after a keyed transform stay in place, as they may act on its output.
+    If no transform is ready, ``render`` returns the pre-serialised
+    markup of the element.
+
+    When every dynamic transform's action declares the ``paths`` it works
+    on, as the ``set_attr``, ``set_text``, ``replace`` and ``add`` helpers
+    do, the plan also builds a skeleton: the matched elements, their
+    ancestors, and a placeholder for every other element, whose markup
+    is serialised once.  ``render`` then copies only the skeleton, runs
+    the ready transforms on it and swaps the markup back in.  Other
+    templates, and ``render_lxml``, copy the whole element.
+
+    The plan notices a new element, a change to the transforms, and
+    ``invalidate`` on the template or any of its bases.  Code that edits
+    a template's element in place must call ``invalidate``.
+    """
+    def __init__(self, template):
+        self.source = template.element
+        self.source_transforms = tuple(template.transforms)
+        self.generation = _invalidations[0]
+        self.versions = _versions(template)
+        self.element = copy.deepcopy(template.element)
+        leading = 0
+        for transform in self.source_transforms:
+            if transform.keys:
+                break
+            leading += 1
+        self.folded = self.source_transforms[:leading]
+        self.transforms = self.source_transforms[leading:]
+        self.index = TransformIndex(list(self.transforms))
+        self._markup = None
+        if self.folded:
+            self._fold()
+        self.skeleton, self.chunks = self._build_skeleton()
+
+    def __repr__(self):
+        return "<RenderPlan (%s transforms, %s folded)>" % (
+            len(self.transforms), len(self.folded))
+
+    def _fold(self):
+        template = _new_template(self.element, list(self.transforms))
+        for transform in self.folded:
+            transform.action(template=template, **copy.deepcopy(transform.context))
+        self.element = template.element
+
+    def _paths(self):
+        paths = set()
+        for transform in self.transforms:
+            action_paths = getattr(transform.action, 'paths', None)
+            if action_paths is None:
+                return None
+            for path in action_paths:
+                if (not path) or _unsafe_path_re.search(path):
+                    return None
+                paths.add(path)
+        return paths
+
+    def _build_skeleton(self):
+        "The skeleton and the markup of its placeholders, or (None, None)"
+        paths = self._paths()
+        if not paths:
+            return None, None
+        targets = set()
+        for path in paths:
+            targets.update(self.element.cssselect(path))
+        keep = set([self.element])
+        for target in targets:
+            keep.update(target.iterancestors())
+        keep = set(
+            el for el in keep
+            if not ((el in targets)
+                    or any(ancestor in targets for ancestor in el.iterancestors())))
+        skeleton = copy.deepcopy(self.element)
+        copies = dict(zip(self.element.iter(), skeleton.iter()))
+        placeholders = []
+        for original in keep:
+            for child in original:
+                if ((not isinstance(child.tag, basestring))
+                    or (child in keep) or (child in targets)):
+                    continue
+                copied = copies[child]
+                placeholder = skeleton.makeelement(
+                    child.tag, {_slot_attribute: str(len(placeholders))})
+                # ``replace`` with text reads the previous sibling's text
+                placeholder.text = copied.text
+                placeholder.tail = copied.tail
+                super(lxml.html.HtmlElement, copied.getparent()).replace(
+                    copied, placeholder)
+                placeholders.append((child, placeholder))
+        if not placeholders:
+            return None, None
+        chunks = []
+        for original, placeholder in placeholders:
+            chunk = lxml.html.tostring(original, pretty_print=True, with_tail=False)
+            stub = lxml.html.tostring(placeholder, pretty_print=True, with_tail=False)
+            extra = stub[_slot_re.match(stub).end():]
+            if not chunk.endswith(extra):
+                return None, None
+            chunks.append(chunk[:len(chunk) - len(extra)])
+        filled = _slot_re.sub(
+            lambda match: chunks[int(match.group(2))],
+            lxml.html.tostring(skeleton, pretty_print=True))
+        if filled != self.markup:
+            return None, None
+        return skeleton, chunks
+
+    def matches(self, template):
+        "Is this plan still valid for ``template``?"
+        if ((self.source is not template.element)
+            or (self.source_transforms != tuple(template.transforms))):
+            return False
+        if self.generation != _invalidations[0]:
+            if self.versions != _versions(template):
+                return False
+            self.generation = _invalidations[0]
+        return True
+
+    def describe(self):
+        "The transforms folded into the element, and those run per render"
+        return dict(
+            folded=list(self.folded),
+            dynamic=list(self.transforms))
+
+    @property
+    def markup(self):
+        if self._markup is None:
+            self._markup = lxml.html.tostring(self.element, pretty_print=True)
+        return self._markup
+
+    def _run(self, element, ready, pending, context):
+        template = _Rendering(copy.deepcopy(element), list(pending))
+        for transform in ready:
+            kwargs = dict(transform.context)
+            for key in transform.keys:
+                kwargs[key] = context[key]
+            transform.action(template=template, **kwargs)
+        return template.element
+
+    def render_lxml(self, context):
+        ready, pending = self.index.split(context)
+        return self._run(self.element, ready, pending, context)
+
+    def render(self, context):
+        ready, pending = self.index.split(context)
+        if not ready:
+            return self.markup
+        if self.skeleton is None:
+            html = self._run(self.element, ready, pending, context)
+            return lxml.html.tostring(html, pretty_print=True)
+        html = self._run(self.skeleton, ready, pending, context)
+        return _slot_re.sub(
+            lambda match: self.chunks[int(match.group(2))],
+            lxml.html.tostring(html, pretty_print=True))
+
+
 class TemplateMeta(type):
     applied_transforms = []
 
@@ -43,40 +332,69 @@ class TemplateMeta(type):
             keys = keys | transform.keys
         return keys
 
+    def _get_index(self):
+        for owner in self.__mro__:
+            if 'transforms' in owner.__dict__:
+                break
+        index = owner.__dict__.get('_transform_index', None)
+        if (index is None) or (not index.matches(self.transforms)):
+            index = TransformIndex(self.transforms)
+            owner._transform_index = index
+        return index
+
     def apply(self, context):
-        for transform in list(self.transforms):
-            new_transform = transform.apply(context)
-            self.transforms.remove(transform)
+        self.invalidate()
+        index = self._get_index()
+        done, replaced = [], {}
+        for seq in index.waiting_on(context):
+            new_transform = index.entries[seq].apply(context)
             if new_transform.applied:
                 new_transform.action(template=self, **new_transform.context)
                 self.applied_transforms.append(new_transform)
+                done.append(seq)
             else:
-                self.transforms.append(new_transform)
+                replaced[seq] = new_transform
+        index.update(done, replaced)
 
     def copy(self):
-        return TemplateMeta(
-            'Template',
-            (Template,),
-            dict(
-                element=copy.deepcopy(self.element),
-                transforms=copy.deepcopy(self.transforms)))
+        return _new_template(
+            copy.deepcopy(self.element),
+            copy.deepcopy(self.transforms))
+
+    def compile(self):
+        "Return a ``RenderPlan`` for this template, reusing it while it is valid"
+        plan = self.__dict__.get('_plan', None)
+        if (plan is None) or (not plan.matches(self)):
+            plan = RenderPlan(self)
+            self._plan = plan
+        return plan
+
+    def invalidate(self):
+        """Drop the compiled plans of this template and its subclasses,
+        after changing ``element`` in place"""
+        _invalidations[0] += 1
+        self._version = self.__dict__.get('_version', 0) + 1
+        self._plan = None
+
+    def describe(self):
+        "Which transforms the compiled template folds and which stay dynamic"
+        return self.compile().describe()
 
     def extend(self, template):
+        self.invalidate()
         self.transforms.extend(template.transforms)
         self.apply(template(dict()))
 
     def add_widget(self, path, template):
+        self.invalidate()
         self.element.add(path, template.element)
         self.transforms.extend(template.transforms)
 
     def render_lxml(self, kwargs):
-        template = self.copy()
-        template.apply(kwargs)
-        return template.element
+        return self.compile().render_lxml(kwargs)
 
     def render(self, **kwargs):
-        html = self.render_lxml(kwargs)
-        return lxml.html.tostring(html, pretty_print=True)
+        return self.compile().render(kwargs)
 
     def __call__(self, kwargs):
         return self.render_lxml(kwargs)
@@ -142,34 +460,41 @@ def set_attr(path, attr, content_func):
             path,
             attr,
             content_func(**kwargs))
+    _set_attr.paths = (path,)
     return _set_attr
 
 def set_text(path, content_func):
     def _set_text(template, **kwargs):
         for el in template.element.cssselect(path):
             el.text = content_func(**kwargs)
+    _set_text.paths = (path,)
     return _set_text
 
-def replace(path, content_func):
+def replace(path, content_func, move=False):
     def _replace(template, **kwargs):
         template.element.replace(
             path,
-            content_func(**kwargs))
+            content_func(**kwargs),
+            move=move)
+    _replace.paths = (path,)
     return _replace
 
-def add(path, content_func, index=None):
+def add(path, content_func, index=None, move=False):
     def _add(template, **kwargs):
         template.element.add(
             path,
             content_func(**kwargs),
-            index=index)
+            index=index,
+            move=move)
+    _add.paths = (path,)
     return _add
 
-def add_multiple(path, content_func, index=None):
+def add_multiple(path, content_func, index=None, move=False):
     def _add(element, **kwargs):
         for item in content_func(**kwargs):
             element.add(
                 path,
                 item,
-                index=index)
+                index=index,
+                move=move)
     return _add
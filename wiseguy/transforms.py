@@ -2,11 +2,12 @@
 
 import urlparse
 
-import cssselect
-css = cssselect.HTMLTranslator().css_to_xpath
+import lxml.etree
+import werkzeug as wz
 
+import wiseguy.utils
 from wiseguy import html_tags as ht
-from wiseguy.template import Transform
+from wiseguy.template import Transform, add
 
 
 def stylesheet(href):
@@ -22,16 +23,14 @@ def script(href):
 def add_stylesheet(href):
     return Transform(
         [],
-        lambda template: template.element.add(
-            "head",
-            stylesheet(href)))
+        add("head", lambda: stylesheet(href), move=True))
 
 def add_script(href):
     return Transform(
         [],
-        lambda template: template.element.add(
-            "head",
-            script(href)))
+        add("head", lambda: script(href), move=True))
+
+_unfixed = object()
 
 _url_fixable_tags = set([
     ("link", "href"),
@@ -41,21 +40,41 @@ _url_fixable_tags = set([
     ("img", "src"),
 ])
 
+_url_attributes = lxml.etree.XPath(" | ".join(
+    "descendant-or-self::%s/@%s" % (tag, attr)
+    for (tag, attr) in sorted(_url_fixable_tags)))
+
+_fixed_urls = wiseguy.utils.LRUCache(4096)
+
+def _fix_url(value, url):
+    parts = urlparse.urlparse(value)
+    if (not parts.netloc) and (parts.path.startswith("/")):
+        return urlparse.urlunparse((
+            parts.scheme,
+            parts.netloc,
+            url(parts.path),
+            parts.params,
+            parts.query,
+            parts.fragment))
+    return None
+
 def _fix_urls(element, url):
-    for (tag, attr) in _url_fixable_tags:
-        path = css("%s[%s]" % (tag, attr))
-        for el in element.xpath(path):
-            value = el.attrib[attr]
-            parts = urlparse.urlparse(value)
-            if (not parts.netloc) and (parts.path.startswith("/")):
-                new_url = urlparse.urlunparse((
-                    parts.scheme,
-                    parts.netloc,
-                    url(parts.path),
-                    parts.params,
-                    parts.query,
-                    parts.fragment))
-                el.attrib[attr] = new_url
+    if isinstance(url, wz.Href):
+        # Key on the plain string, the attribute result pins its element
+        url_key = (url.base, url.charset)
+        for value in _url_attributes(element):
+            key = (url_key, unicode(value))
+            new_url = _fixed_urls.get(key, _unfixed)
+            if new_url is _unfixed:
+                new_url = _fix_url(key[1], url)
+                _fixed_urls.set(key, new_url)
+            if new_url is not None:
+                value.getparent().attrib[value.attrname] = new_url
+    else:
+        for value in _url_attributes(element):
+            new_url = _fix_url(value, url)
+            if new_url is not None:
+                value.getparent().attrib[value.attrname] = new_url
 
 def fix_urls():
     return Transform(
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-import difflib, pprint, re, copy
+import difflib, pprint, re, copy, itertools, threading
 
 import werkzeug as wz
 
@@ -62,6 +62,95 @@ def join(joiner, iterable):
         next_item = queued_item
     yield next_item
 
+def iter_chunks(pieces, chunk_size=8192, encoding='utf-8'):
+    """Encode an iterable of strings and regroup them into byte strings
+    of at least ``chunk_size`` bytes (except possibly the last one).
+    """
+    buf = []
+    size = 0
+    for piece in pieces:
+        if isinstance(piece, unicode):
+            piece = piece.encode(encoding)
+        buf.append(piece)
+        size = size + len(piece)
+        if size >= chunk_size:
+            yield "".join(buf)
+            buf = []
+            size = 0
+    if buf:
+        yield "".join(buf)
+
+
+class LRUCache(object):
+    """A size-bounded mapping that discards the least recently used
+    items, and counts hits, misses and evictions.
+
+    Lookups only record a use counter, so hits stay cheap.  When the
+    cache overflows the oldest tenth of it is dropped in one go.
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._items = dict()
+        self._ticks = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return "<LRUCache %s/%s>" % (len(self), self.maxsize)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        try:
+            entry = self._items[key]
+        except KeyError:
+            self.misses = self.misses + 1
+            return default
+        entry[1] = self._ticks.next()
+        self.hits = self.hits + 1
+        return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = [value, self._ticks.next()]
+            if len(self._items) > self.maxsize:
+                self._evict()
+
+    def _evict(self):
+        keep = self.maxsize - (self.maxsize // 10)
+        by_age = sorted(self._items.items(), key=lambda item: item[1][1])
+        for key, entry in by_age[:len(by_age) - keep]:
+            del self._items[key]
+            self.evictions = self.evictions + 1
+
+    def get_or_create(self, key, factory):
+        value = self.get(key, _DEFAULT)
+        if value is _DEFAULT:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            size=len(self._items),
+            maxsize=self.maxsize)
+
 
 class MockObject(object):
     def __init__(self, **kwargs):
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from functools import wraps
+import types
 import uuid
 import os
 
@@ -22,6 +23,18 @@ def wsgi_wrapper(app, request_class=wz.Request):
         return res
     return application
 
+def _shift_path_info(environ, path_info):
+    "Move the start of PATH_INFO onto SCRIPT_NAME, leaving ``path_info``"
+    current = environ['PATH_INFO']
+    if current.endswith(path_info):
+        split = len(current) - len(path_info)
+        environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + current[:split]
+        environ['PATH_INFO'] = current[split:]
+    else:
+        while path_info != environ['PATH_INFO']:
+            popped = wz.wsgi.pop_path_info(environ)
+            assert popped
+
 def _do_dispatch(app, req):
     try:
         rule, kwargs = req.map_adapter.match(return_rule=True)
@@ -29,12 +42,9 @@ def _do_dispatch(app, req):
             path_info = kwargs.pop('path_info')
             if not path_info.startswith("/"):
                 path_info = "/" + path_info
-            while path_info != req.environ['PATH_INFO']:
-                popped = wz.wsgi.pop_path_info(req.environ)
-                assert popped
+            _shift_path_info(req.environ, path_info)
         else:
-            while req.environ['PATH_INFO']:
-                wz.wsgi.pop_path_info(req.environ)
+            _shift_path_info(req.environ, "")
         endpoint = app.url_map.views[rule.endpoint]
         res = endpoint(req, **kwargs)
     except wz.exceptions.HTTPException, e:
@@ -70,8 +80,16 @@ class JinjaEnv(object):
     def render(self, template_name, context):
         return self.env.get_template(template_name).render(context)
 
-    def get_response(self, template_name, context, mimetype="text/html"):
-        body = self.render(template_name, context)
+    def iter_render(self, template_name, context, chunk_size=8192):
+        return utils.iter_chunks(
+            self.env.get_template(template_name).generate(context),
+            chunk_size)
+
+    def get_response(self, template_name, context, mimetype="text/html", stream=False):
+        if stream:
+            body = self.iter_render(template_name, context)
+        else:
+            body = self.render(template_name, context)
         res = wz.Response(body, mimetype=mimetype)
         return res
 
@@ -79,37 +97,86 @@ class JinjaEnv(object):
         return self.env.from_string(text)
 
 class LxmlEnv(object):
-    def __init__(self, env, global_context=None):
+    def __init__(self, env, global_context=None, tidy=False):
         self.env = env
         if not global_context:
             global_context = dict()
         self.globals = global_context
+        self.tidy = tidy
 
-    def render(self, template_name, context):
+    def _render_element(self, template_name, context):
         local_context = dict(self.globals)
         local_context.update(context)
-        element = getattr(self.env, template_name)(local_context)
-        html = element.to_string()
+        return getattr(self.env, template_name)(local_context)
+
+    def render(self, template_name, context):
+        element = self._render_element(template_name, context)
+        html = element.to_string(tidy=self.tidy)
         return html
 
-    def get_response(self, template_name, context, mimetype="text/html"):
-        body = self.render(template_name, context)
+    def iter_render(self, template_name, context, chunk_size=8192):
+        element = self._render_element(template_name, context)
+        return element.iter_string(tidy=self.tidy, chunk_size=chunk_size)
+
+    def get_response(self, template_name, context, mimetype="text/html", stream=False):
+        "``stream`` only applies with ``tidy``, see ``HtmlElement.iter_string``"
+        if stream and self.tidy:
+            body = self.iter_render(template_name, context)
+        else:
+            body = self.render(template_name, context)
         res = wz.Response(body, mimetype=mimetype)
         return res
 
 class JadeEnv(object):
-    def __init__(self, directory, global_context=None):
+    """Renders ``.jade`` templates from ``directory``.
+
+    Templates are cached by path and re-read when the file's mtime, inode
+    or size changes.  In ``production`` mode a file is only stat'ed the
+    first time it is loaded.  The files that ``loader`` includes or
+    extends are also kept parsed.  A rendered template's source still
+    goes through ``jade.to_html``, which handles the doctype, so its
+    output is the same as without the cache.
+    """
+    def __init__(self, directory, global_context=None, production=False):
         self.directory = path.path(directory)
         if global_context:
             self.globals = dict(global_context)
         else:
             self.globals = dict()
         self.globals['loader'] = self._loader
+        self.production = production
+        self._cache = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_cached(self, f):
+        "The [stamp, source, parsed data or None] entry for ``f``"
+        cached = self._cache.get(f, None)
+        if self.production:
+            stamp = None
+        else:
+            st = os.stat(f)
+            stamp = (st.st_mtime, st.st_ino, st.st_size)
+        if cached and (self.production or (cached[0] == stamp)):
+            self.hits = self.hits + 1
+            return cached
+        self.misses = self.misses + 1
+        cached = [stamp, f.text(), None]
+        self._cache[f] = cached
+        return cached
+
+    def _get_data(self, f):
+        cached = self._get_cached(f)
+        if cached[2] is None:
+            data = jade.generate_data(cached[1])
+            if isinstance(data, types.GeneratorType):
+                data = list(data)
+            cached[2] = data
+        return cached[2]
 
     def _loader(self, filename, context):
         f = self.directory / filename
-        src = f.text()
-        data = jade.generate_data(src)
+        data = self._get_data(f)
         elements = jade.generate_elements(data, context=context)
         return elements
 
@@ -118,8 +185,7 @@ class JadeEnv(object):
         if context:
             local_context.update(context)
         f = self.directory.child("%s.jade"%template_name)
-        text = f.text()
-        html = jade.to_html(text, context=local_context)
+        html = jade.to_html(self._get_cached(f)[1], context=local_context)
         return html
 
     def get_response(self, template_name, context, mimetype="text/html"):
@@ -127,6 +193,23 @@ class JadeEnv(object):
         res = wz.Response(body, mimetype=mimetype)
         return res
 
+    def clear_cache(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        if total:
+            hit_rate = float(self.hits) / total
+        else:
+            hit_rate = 0.0
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            size=len(self._cache),
+            hit_rate=hit_rate)
+
 def make_url_map(mountpoint, sub_url_map):
     url_map = UrlMap([
         wz.routing.Submount(
@@ -169,12 +252,91 @@ def make_client_env(var_dir, client, extra_globals=None):
 
 
 class UrlMap(wz.routing.Map):
+    """A ``Map`` that holds its views, and speeds up dispatch.
+
+    Adapters are cached per host, script name and scheme, so binding to
+    an environ doesn't redo the server name and subdomain work.  Rules
+    without arguments are kept in a dict keyed by subdomain and path, so
+    matching a static URL skips the regex matcher.
+    """
     def __init__(self, rules=None, views=None, *args, **kwargs):
         if not views:
             views = dict()
         self.views = views
+        self._adapters = utils.LRUCache(maxsize=64)
+        self._static_routes = None
         super(UrlMap, self).__init__(rules, *args, **kwargs)
 
+    def add(self, rulefactory):
+        super(UrlMap, self).add(rulefactory)
+        self._adapters.clear()
+        self._static_routes = None
+
+    def bind_to_environ(self, environ, server_name=None, subdomain=None):
+        if (server_name is not None) or (subdomain is not None):
+            return super(UrlMap, self).bind_to_environ(
+                environ, server_name=server_name, subdomain=subdomain)
+        environ = getattr(environ, 'environ', environ)
+        key = (
+            environ.get('HTTP_HOST', None),
+            environ.get('SERVER_NAME', None),
+            environ.get('SERVER_PORT', None),
+            environ.get('SCRIPT_NAME', None),
+            environ['wsgi.url_scheme'])
+        bound = self._adapters.get(key)
+        if bound is None:
+            bound = super(UrlMap, self).bind_to_environ(environ)
+            self._adapters.set(key, bound)
+        return UrlMapAdapter(
+            self,
+            bound.server_name,
+            bound.script_name,
+            bound.subdomain,
+            bound.url_scheme,
+            environ.get('PATH_INFO', '/'),
+            environ['REQUEST_METHOD'],
+            environ.get('QUERY_STRING', ''))
+
+    def _build_static_routes(self):
+        self.update()
+        routes = dict()
+        if self.host_matching:
+            return routes
+        if not self.strict_slashes:
+            return routes
+        for rule in self._rules:
+            if not rule.strict_slashes:
+                return routes
+        default_endpoints = set(
+            [rule.endpoint for rule in self._rules if rule.defaults])
+        skip = set()
+        for rule in self._rules:
+            if rule.arguments:
+                continue
+            key = (rule.subdomain, rule.rule)
+            if key in skip:
+                continue
+            if (rule.build_only or rule.alias or rule.defaults
+                or (rule.redirect_to is not None)
+                or (rule.endpoint in default_endpoints)):
+                skip.add(key)
+                continue
+            routes.setdefault(key, []).append(rule)
+        return routes
+
+    def match_static(self, subdomain, path_info, method):
+        "Return the rule for a URL without arguments, or None"
+        if self._static_routes is None:
+            self._static_routes = self._build_static_routes()
+        if not isinstance(path_info, unicode):
+            path_info = path_info.decode(self.charset, self.encoding_errors)
+        path = u"/" + path_info.lstrip(u"/")
+        method = method.upper()
+        for rule in self._static_routes.get((subdomain, path), ()):
+            if (rule.methods is None) or (method in rule.methods):
+                return rule
+        return None
+
     def expose(self, rule, methods=['GET'], **kw):
         def decorate(func):
             if not kw.has_key('endpoint'):
@@ -201,6 +363,24 @@ class UrlMap(wz.routing.Map):
         return decorate
 
 
+class UrlMapAdapter(wz.routing.MapAdapter):
+    def match(self, path_info=None, method=None, return_rule=False, query_args=None):
+        rule = self.map.match_static(
+            self.subdomain,
+            path_info if path_info is not None else self.path_info,
+            method or self.default_method)
+        if rule is None:
+            return super(UrlMapAdapter, self).match(
+                path_info=path_info,
+                method=method,
+                return_rule=return_rule,
+                query_args=query_args)
+        if return_rule:
+            return rule, {}
+        else:
+            return rule.endpoint, {}
+
+
 class UUIDConverter(wz.routing.BaseConverter):
     def __init__(self, url_map):
         super(UUIDConverter, self).__init__(url_map)
@@ -11,19 +11,74 @@ def default_kwargs_filter(context, offset, limit, order=None):
     else:
         return dict(offset=offset, limit=limit)
 
+class PageState(object):
+    """The arithmetic for paging through ``total`` items, ``limit`` at a
+    time, from ``offset``.  Computed once and shared by ``prev_li``,
+    ``next_li`` and ``pagination``."""
+    def __init__(self, context):
+        self.total = context.get('total', None)
+        self.offset = context['offset']
+        self.limit = context['limit']
+        self.order = context.get('order', False)
+        self.has_prev = self.offset > 0
+        self.prev_offset = max(0, self.offset - self.limit)
+        self.current = (self.offset // self.limit) + 1
+        if self.total is None:
+            self.has_next = False
+            self.num_pages = 0
+        else:
+            self.has_next = self.total > (self.offset + self.limit)
+            self.num_pages = (self.total + self.limit - 1) // self.limit
+        self.next_offset = self.offset + self.limit
+
+    def page(self, page):
+        "The details of page number ``page``"
+        offset = (page - 1) * self.limit
+        return dict(
+            page=page,
+            offset=offset,
+            limit=self.limit,
+            start=offset + 1,
+            end=offset + self.limit,
+            active=(page == self.current))
+
+    def pages(self):
+        for page in xrange(1, self.num_pages + 1):
+            yield self.page(page)
+
+    def window(self, size):
+        """The first and last pages and ``size`` pages either side of the
+        current one, with ``None`` where pages are left out"""
+        first = max(1, self.current - size)
+        last = min(self.num_pages, self.current + size)
+        numbers = range(first, last + 1)
+        if self.num_pages:
+            numbers = sorted(set([1, self.num_pages] + numbers))
+        previous = None
+        for page in numbers:
+            if previous is not None:
+                if page - previous == 2:
+                    yield self.page(previous + 1)
+                elif page - previous > 2:
+                    yield None
+            yield self.page(page)
+            previous = page
+
+
 @j2.contextfunction
-def prev_li(context, item_url, kwargs_filter=default_kwargs_filter):
+def prev_li(context, item_url, kwargs_filter=default_kwargs_filter, state=None):
+    if state is None:
+        state = PageState(context)
     prev_classes = ['prev']
     attrs = dict()
-    if not context['offset'] > 0:
+    if not state.has_prev:
         prev_classes.append('disabled')
     else:
-        new_offset = max(0, context['offset']-context['limit'])
         href_kwargs = kwargs_filter(
             context=context,
-            offset=new_offset,
-            limit=context['limit'],
-            order=context.get('order', False))
+            offset=state.prev_offset,
+            limit=state.limit,
+            order=state.order)
         attrs['href'] = item_url(**href_kwargs)
     prev = html.LI(
         html.A(
@@ -34,18 +89,19 @@ def prev_li(context, item_url, kwargs_filter=default_kwargs_filter):
     return prev
 
 @j2.contextfunction
-def next_li(context, item_url, kwargs_filter=default_kwargs_filter):
+def next_li(context, item_url, kwargs_filter=default_kwargs_filter, state=None):
+    if state is None:
+        state = PageState(context)
     next_classes = ['next']
     attrs = dict()
-    if not context['total'] > (context['offset'] + context['limit']):
+    if not state.has_next:
         next_classes.append('disabled')
     else:
-        new_offset = context['offset'] + context['limit']
         href_kwargs = kwargs_filter(
             context=context,
-            offset=new_offset,
-            limit=context['limit'],
-            order=context.get('order', False))
+            offset=state.next_offset,
+            limit=state.limit,
+            order=state.order)
         attrs['href'] = item_url(**href_kwargs)
     next = html.LI(
         html.A(
@@ -56,45 +112,33 @@ def next_li(context, item_url, kwargs_filter=default_kwargs_filter):
     return next
 
 def page_counter(context):
-    total = context['total']
-    offset = context['offset']
-    limit = context['limit']
-    current = 0
-    page = 0
-    while current < total:
-        page = page + 1
-        start = current + 1
-        end = current + limit
-        if current <= offset < end:
-            active = True
-        else:
-            active = False
-        yield dict(
-            page=page,
-            offset=current,
-            limit=limit,
-            start=start,
-            end=end,
-            active=active)
-        current = current + limit
+    return PageState(context).pages()
 
 
 @j2.contextfunction
-def pagination(context, item_url, kwargs_filter=default_kwargs_filter, class_=None):
-    prev = prev_li(context, item_url, kwargs_filter)
-    next = next_li(context, item_url, kwargs_filter)
-    total = context['total']
-    offset = context['offset']
-    limit = context['limit']
-    order = context.get('order', False)
+def pagination(context, item_url, kwargs_filter=default_kwargs_filter, class_=None, window=None):
+    """A list of links to pages.  With ``window``, only the first and
+    last pages and ``window`` pages either side of the current one are
+    linked, with gaps shown as ellipses."""
+    state = PageState(context)
     elements = []
-    elements.append(prev)
-    for page in page_counter(context):
+    elements.append(prev_li(context, item_url, kwargs_filter, state=state))
+    if window is None:
+        pages = state.pages()
+    else:
+        pages = state.window(window)
+    for page in pages:
+        if page is None:
+            elements.append(
+                html.LI(
+                    html.SPAN(u"…"),
+                    {'class': "disabled"}))
+            continue
         href_kwargs = kwargs_filter(
             context=context,
             offset=page['offset'],
             limit=page['limit'],
-            order=order)
+            order=state.order)
         href = item_url(**href_kwargs)
         if page['active']:
             li_class = {'class': (page['active'] and "active" or "")}
@@ -106,7 +150,7 @@ def pagination(context, item_url, kwargs_filter=default_kwargs_filter, class_=No
                 href=href),
             li_class)
         elements.append(el)
-    elements.append(next)
+    elements.append(next_li(context, item_url, kwargs_filter, state=state))
     classes = ['pagination']
     if class_:
         classes.append(class_)